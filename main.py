@@ -1,72 +1,157 @@
 import os
+import argparse
+import logging
+import math
+import random
 import time
 import signal
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from modules.database_handler import DatabaseHandler
-from modules.google_sheets_handler import GoogleSheetsHandler
-from modules.fio_handler import FIOHandler
+from functools import cached_property
+from itertools import groupby
+from logging.handlers import RotatingFileHandler
+from operator import itemgetter
+from pathlib import Path
 from modules.constants import (
     APP_NAME, APP_VERSION, APP_STATE
 )
 
+# ENVIRONMENT is only read at startup, so the dev feature check is resolved once
+_DEV_FEATURES = APP_STATE == "dev" and os.getenv("ENVIRONMENT", "").upper() == "DEV"
+
+# Handled errors print their traceback in dev mode only; bound once instead of checked per call
+if _DEV_FEATURES:
+    from traceback import print_exc as _maybe_trace
+else:
+    def _maybe_trace():
+        """Tracebacks are only printed when dev features are enabled."""
+
+# Full error tracebacks go to a size-capped log file rather than the console
+log = logging.getLogger(APP_NAME)
+ERROR_LOG_PATH = Path(__file__).resolve().parent / 'sync.log'
+
+# Tracked users fetched at once while syncing; FIOHandler.MAX_CONCURRENT_REQUESTS caps the
+# FIO requests actually in flight across all of them
+FIO_MAX_WORKERS = 4
+
+# Countdown line template: current time, time left, last-sync suffix
+_STATUS_TPL = "\r🕐 %s | Next sync in: %s%s".__mod__
+
+
+# Set by SIGINT/SIGTERM; the scheduler's waits return as soon as it is set
+_SHUTDOWN = threading.Event()
+
+
+def _signal_handler(signum, frame):
+    """Handle shutdown signals gracefully."""
+    print(f"\n🔴 Received signal {signum}, shutting down gracefully...")
+    _SHUTDOWN.set()
+
+
+class ConfigurationError(Exception):
+    """Raised when required settings are missing and cannot be prompted for."""
+
 
 class SyncScheduler:
     """Handles scheduling and running of sync operations."""
 
-    def __init__(self):
-        self.running = True
-        self.db = None
-        self.sheets_handler = None
-        self.fio_handler = None
-        self.last_sync_time = None
+    # How often (in seconds) the loop wakes to refresh the countdown and check for a missed sync
+    STATUS_INTERVAL = 30
 
-        # Set up signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
+    # A scheduled sync is skipped if a sync already finished this recently
+    MIN_SYNC_INTERVAL = timedelta(hours=1)
 
-    def _signal_handler(self, signum, frame):
-        """Handle shutdown signals gracefully."""
-        print(f"\n🔴 Received signal {signum}, shutting down gracefully...")
-        self.running = False
+    # Upper bound (in seconds) for the back-off after repeated main loop errors
+    MAX_ERROR_BACKOFF = 300
 
-    def _get_next_midnight(self):
-        """Calculate the next midnight datetime."""
-        now = datetime.now()
+    def __init__(self):
+        self._stop = _SHUTDOWN
+        self._sync_lock = threading.Lock()
+        self._error_count = 0
+        self.last_sync_time = None
+        self._last_sync_suffix = ""
+        self._status_minutes = None
+        self._stdout_write = sys.stdout.write
+        self._stdout_flush = sys.stdout.flush
+        self.next_sync_time = None
+        self._sync_deadline = None
+
+    @cached_property
+    def db(self):
+        """Database handler shared by every sync."""
+        from modules.database_handler import DatabaseHandler
+        return DatabaseHandler()
+
+    @cached_property
+    def sheets_handler(self):
+        """Google Sheets client, authenticated once and reused across syncs."""
+        from modules.google_sheets_handler import GoogleSheetsHandler
+        return GoogleSheetsHandler(self.db)
+
+    @cached_property
+    def fio_handler(self):
+        """FIO API client; an authentication failure is raised and retried on the next sync."""
+        print("🌐 Initializing FIO API connection...")
+        from modules.fio_handler import FIOHandler
+        handler = FIOHandler(self.db)
+        if not handler.is_authenticated():
+            raise RuntimeError("FIO API authentication failed")
+        print(f"✅ FIO API connected as: {handler.get_username()}")
+        return handler
+
+    @cached_property
+    def sheets_settings(self):
+        """Google Sheets settings, resolved (and prompted for if needed) once."""
+        return load_or_prompt_sheets_settings(self.db)
+
+    def _get_next_midnight(self, now):
+        """Calculate the midnight following the given datetime."""
         next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
         return next_midnight
 
-    def _get_time_until_next_sync(self):
-        """Get seconds until next midnight sync."""
-        now = datetime.now()
-        next_midnight = self._get_next_midnight()
-        return (next_midnight - now).total_seconds()
+    def _get_time_until_next_sync(self, now):
+        """Get seconds from the given datetime until the scheduled sync (negative once it is overdue)."""
+        return (self.next_sync_time - now).total_seconds()
+
+    def _schedule_next_sync(self, now):
+        """Fix the next midnight sync and the monotonic deadline used to sleep until it."""
+        self.next_sync_time = self._get_next_midnight(now)
+        self._sync_deadline = time.monotonic() + self._get_time_until_next_sync(now)
 
     def _format_countdown(self, seconds):
         """Format seconds into a readable countdown string."""
         if seconds <= 0:
             return "Sync starting..."
 
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
+        # Minute resolution, rounded up so the countdown never reads zero early
+        hours, minutes = divmod(math.ceil(seconds / 60), 60)
 
         if hours > 0:
-            return f"{hours:02d}h {minutes:02d}m {secs:02d}s"
+            return f"{hours:02d}h {minutes:02d}m"
         else:
-            return f"{minutes:02d}m {secs:02d}s"
+            return f"{minutes:02d}m"
 
     def _display_status(self, seconds_until_sync):
         """Display current status with countdown."""
+        # Clock and countdown both have minute resolution and roll over together,
+        # so nothing (not even the clock read) is needed until the minute count changes
+        minutes_left = math.ceil(seconds_until_sync / 60)
+        if minutes_left == self._status_minutes:
+            return
+        self._status_minutes = minutes_left
+
         countdown = self._format_countdown(seconds_until_sync)
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        current_time = datetime.now().isoformat(sep=' ', timespec='minutes')
 
-        status_line = f"\r🕐 {current_time} | Next sync in: {countdown}"
-        if self.last_sync_time:
-            last_sync_str = self.last_sync_time.strftime("%Y-%m-%d %H:%M:%S")
-            status_line += f" | Last sync: {last_sync_str}"
+        self._stdout_write(_STATUS_TPL((current_time, countdown, self._last_sync_suffix)))
+        self._stdout_flush()
 
-        print(status_line, end="", flush=True)
+    def _record_sync(self, finished_at):
+        """Remember when the last successful sync finished."""
+        self.last_sync_time = finished_at
+        self._last_sync_suffix = f" | Last sync: {self.last_sync_time.isoformat(sep=' ', timespec='seconds')}"
 
     def run_continuous_sync(self):
         """Main loop for continuous sync operation."""
@@ -74,13 +159,19 @@ class SyncScheduler:
         print(f"📅 Sync will occur daily at midnight (server time)")
         print(f"ℹ️ Press Ctrl+C to stop gracefully\n")
 
+        # Resolve settings now so any prompting happens at startup, not during a sync
+        try:
+            self.sheets_settings
+        except ConfigurationError as e:
+            print(f"⚠️  {e}")
+
         # Run initial sync on startup
         print("🔄 Running initial sync...")
         success = self._perform_sync()
 
         if success:
-            self.last_sync_time = datetime.now()
-            print(f"\n✅ Initial sync completed at {self.last_sync_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            self._record_sync(datetime.now())
+            print(f"\n✅ Initial sync completed at {self.last_sync_time.isoformat(sep=' ', timespec='seconds')}")
         else:
             print(f"\n❌ Initial sync failed")
 
@@ -88,80 +179,124 @@ class SyncScheduler:
         print("📊 Entering continuous monitoring mode...")
         print("=" * 70)
 
-        # Main monitoring loop
-        while self.running:
-            try:
-                seconds_until_sync = self._get_time_until_next_sync()
+        # Only render the countdown when someone is watching
+        show_status = sys.stdout.isatty()
 
-                # Display status
-                self._display_status(seconds_until_sync)
+        # Fix the next fire time up front so an early wake-up or a clock jump
+        # can neither skip the sync nor run it twice
+        self._schedule_next_sync(datetime.now())
 
-                # Check if it's time to sync (within 1 second of midnight)
-                if seconds_until_sync <= 1:
-                    print(f"\n\n🔄 Starting scheduled sync at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                    print("=" * 50)
+        # Main monitoring loop
+        while not self._stop.is_set():
+            try:
+                # Sleep math runs on the monotonic clock so wall-clock steps can't shift it,
+                # but that clock stops during a suspend, so a wall clock already past midnight wins
+                seconds_until_sync = min(self._sync_deadline - time.monotonic(),
+                                         self._get_time_until_next_sync(datetime.now()))
+
+                if seconds_until_sync > 0:
+                    if show_status:
+                        # Display status, waking up periodically to refresh it
+                        self._display_status(seconds_until_sync)
+
+                    # Wake up periodically even unattended, so a resume from suspend is noticed;
+                    # returns early on shutdown
+                    self._stop.wait(timeout=min(self.STATUS_INTERVAL, seconds_until_sync))
+                    continue
+
+                # Deadline reached; if the wall clock was stepped back we are early, so re-anchor
+                now = datetime.now()
+                wall_seconds_left = self._get_time_until_next_sync(now)
+                if wall_seconds_left > 1:
+                    self._sync_deadline = time.monotonic() + wall_seconds_left
+                    continue
+
+                # The startup sync may have just run; don't repeat it straight away
+                if self.last_sync_time and now - self.last_sync_time < self.MIN_SYNC_INTERVAL:
+                    print(f"\n⏭️ Skipping scheduled sync, last sync finished at "
+                          f"{self.last_sync_time.isoformat(sep=' ', timespec='seconds')}")
+                    self._schedule_next_sync(now)
+                    self._status_minutes = None
+                    continue
+
+                print(f"\n\n🔄 Starting scheduled sync at {now.isoformat(sep=' ', timespec='seconds')}")
+                print("=" * 50)
+
+                success = self._perform_sync()
+                finished_at = datetime.now()
 
-                    success = self._perform_sync()
+                if success:
+                    self._record_sync(finished_at)
+                    self._error_count = 0
+                    print(f"✅ Scheduled sync completed at {finished_at.isoformat(sep=' ', timespec='seconds')}")
+                else:
+                    print(f"❌ Scheduled sync failed at {finished_at.isoformat(sep=' ', timespec='seconds')}")
 
-                    if success:
-                        self.last_sync_time = datetime.now()
-                        print(f"✅ Scheduled sync completed at {self.last_sync_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                    else:
-                        print(f"❌ Scheduled sync failed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                # Runs missed while suspended are coalesced into the one just made
+                self._schedule_next_sync(finished_at)
 
-                    print("=" * 70)
-                    print("📊 Returning to monitoring mode...")
-                    print("=" * 70)
+                print("=" * 70)
+                print("📊 Returning to monitoring mode...")
+                print("=" * 70)
 
-                # Sleep for 1 second before next check
-                time.sleep(1)
+                # Other output was printed, so the status line must be redrawn
+                self._status_minutes = None
 
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 print(f"\n❌ Error in main loop: {e}")
-                if should_enable_dev_features():
-                    import traceback
-                    traceback.print_exc()
-                time.sleep(5)  # Wait before retrying
+                log.exception("Error in main loop")
+                _maybe_trace()
+
+                # Back off exponentially (with jitter) while the error persists
+                self._stop.wait(timeout=min(self.MAX_ERROR_BACKOFF, 2 ** self._error_count) + random.uniform(0, 1))
+                self._error_count += 1
 
-        print(f"\n👋 Sync scheduler stopped at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"\n👋 Sync scheduler stopped at {datetime.now().isoformat(sep=' ', timespec='seconds')}")
 
     def _perform_sync(self):
+        """Perform the sync operation unless one is already in progress."""
+        if not self._sync_lock.acquire(blocking=False):
+            print("⏭️ A sync is already in progress, skipping")
+            return False
+
+        try:
+            return self._sync_all()
+        finally:
+            self._sync_lock.release()
+
+    def _sync_all(self):
         """Perform the actual sync operation."""
         try:
-            # Ensure handlers are initialized
-            if not self.db:
-                self.db = DatabaseHandler()
-            if not self.sheets_handler:
-                self.sheets_handler = GoogleSheetsHandler()
-            if not self.fio_handler:
-                print("🌐 Initializing FIO API connection...")
-                self.fio_handler = FIOHandler()
-                if not self.fio_handler.is_authenticated():
-                    print("❌ FIO API authentication failed")
-                    return False
-                print(f"✅ FIO API connected as: {self.fio_handler.get_username()}")
+            # Ensure the FIO handler is initialized
+            try:
+                fio_handler = self.fio_handler
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                return False
 
             # Sync Google Sheets data
-            sheets_success = sync_sheets_data(self.sheets_handler, self.db)
+            try:
+                sheets_success = sync_sheets_data(self.sheets_handler, self.sheets_settings)
+            except ConfigurationError as e:
+                print(f"❌ Google Sheets sync skipped: {e}")
+                sheets_success = False
 
-            # Sync inventory data
-            inventory_success = sync_inventory_data(self.fio_handler, self.db)
+            # Both user syncs share one read of the tracked users
+            tracked_users = get_tracked_users(self.db)
 
-            # Sync production data
-            production_success = sync_production_data(self.fio_handler, self.db)
+            # Sync inventory and production data in one pass over the tracked users
+            users_success = sync_tracked_users_data(fio_handler, self.db, tracked_users)
 
             # Sync consumption data
-            consumption_success = sync_consumption_data(self.fio_handler, self.db)
+            consumption_success = sync_consumption_data(fio_handler, self.db, tracked_users)
 
-            return sheets_success and inventory_success and production_success and consumption_success
+            return sheets_success and users_success and consumption_success
 
         except Exception as e:
             print(f"❌ Sync operation failed: {e}")
-            if should_enable_dev_features():
-                import traceback
-                traceback.print_exc()
+            _maybe_trace()
             return False
 
 
@@ -177,80 +312,118 @@ def get_version_string(version, state):
     else:
         return f"v{version}"
 
+def configure_error_log():
+    """Send logged errors to a rotating file so persistent faults use bounded disk space."""
+    handler = RotatingFileHandler(ERROR_LOG_PATH, maxBytes=1 << 20, backupCount=3, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    # Routine progress from the modules stays on the console; their warnings and errors are kept here too
+    handler.setLevel(logging.WARNING)
+    log.addHandler(handler)
+    log.propagate = False
+    logging.getLogger("modules").addHandler(handler)
+
+class _ConsoleFormatter(logging.Formatter):
+    """Print just the message, as the old prints did; tracebacks go to the error log only."""
+
+    def format(self, record):
+        return record.getMessage()
+
+def configure_progress_log():
+    """Print the routine sync progress the modules log, as they did before it went through logging."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_ConsoleFormatter())
+    modules_log = logging.getLogger("modules")
+    modules_log.setLevel(logging.INFO)
+    modules_log.addHandler(handler)
+    modules_log.propagate = False
+
 def should_enable_dev_features():
     """Check if development features should be enabled."""
-    environment = os.getenv("ENVIRONMENT", "").upper()
-    return APP_STATE == "dev" and environment == "DEV"
+    return _DEV_FEATURES
+
+# Database setting name behind each Google Sheets settings key
+_SHEETS_SETTING_NAMES = {
+    'spreadsheet_id': 'google_sheets_id',
+    'prices_sheet': 'google_prices_sheet',
+    'shipping_sheet': 'google_shipping_sheet'
+}
 
 def get_stored_settings(db):
-    """Retrieve stored Google Sheets settings from database."""
+    """Retrieve stored Google Sheets settings; DatabaseHandler's settings cache makes repeat calls free."""
     try:
-        spreadsheet_id = db.get_setting('google_sheets_id')
-        prices_sheet = db.get_setting('google_prices_sheet')
-        shipping_sheet = db.get_setting('google_shipping_sheet')
-
-        settings = {
-            'spreadsheet_id': spreadsheet_id.decode('utf-8') if spreadsheet_id else None,
-            'prices_sheet': prices_sheet.decode('utf-8') if prices_sheet else None,
-            'shipping_sheet': shipping_sheet.decode('utf-8') if shipping_sheet else None
-        }
+        stored = db.get_settings(list(_SHEETS_SETTING_NAMES.values()))
+        settings = {key: stored.get(name) or None for key, name in _SHEETS_SETTING_NAMES.items()}
 
+        spreadsheet_id = settings['spreadsheet_id']
         print(
-            f"🔍 Loaded settings: ID={settings['spreadsheet_id'][:10] + '...' if settings['spreadsheet_id'] else 'None'}, "
+            f"🔍 Loaded settings: ID={spreadsheet_id[:10] + '...' if spreadsheet_id else 'None'}, "
             f"Prices='{settings['prices_sheet']}', Shipping='{settings['shipping_sheet']}'")
 
         return settings
     except Exception as e:
         print(f"⚠️  Could not load stored settings: {e}")
-        return {
-            'spreadsheet_id': None,
-            'prices_sheet': None,
-            'shipping_sheet': None
-        }
+        return dict.fromkeys(_SHEETS_SETTING_NAMES)
 
 def save_sheets_settings(db, spreadsheet_id, prices_sheet, shipping_sheet):
     """Save Google Sheets settings to database."""
+    settings = {
+        'spreadsheet_id': spreadsheet_id,
+        'prices_sheet': prices_sheet,
+        'shipping_sheet': shipping_sheet
+    }
     try:
-        db.upsert_setting('google_sheets_id', spreadsheet_id.encode('utf-8'))
-        db.upsert_setting('google_prices_sheet', prices_sheet.encode('utf-8'))
-        db.upsert_setting('google_shipping_sheet', shipping_sheet.encode('utf-8'))
+        db.upsert_settings({name: settings[key] for key, name in _SHEETS_SETTING_NAMES.items()})
         print("💾 Settings saved to database")
     except Exception as e:
         print(f"⚠️  Could not save settings: {e}")
 
-def sync_sheets_data(sheets_handler, db):
-    """Handle Google Sheets synchronization."""
-    print("\n🔄 Google Sheets Synchronization")
-    print("=" * 50)
+def load_or_prompt_sheets_settings(db):
+    """
+    Return complete Google Sheets settings, prompting for missing values.
 
-    # Load stored settings
+    Raises ConfigurationError instead of prompting when stdin is not a terminal.
+    """
     stored_settings = get_stored_settings(db)
+    spreadsheet_id = stored_settings['spreadsheet_id']
+    prices_sheet = stored_settings['prices_sheet']
+    shipping_sheet = stored_settings['shipping_sheet']
+
+    if spreadsheet_id and prices_sheet and shipping_sheet:
+        return stored_settings
+
+    if not sys.stdin.isatty():
+        raise ConfigurationError("Google Sheets settings are incomplete; run `python main.py --setup`")
 
     # Get spreadsheet ID - ask if not stored
-    if stored_settings['spreadsheet_id']:
-        print(f"📊 Using stored spreadsheet ID: {stored_settings['spreadsheet_id'][:10]}...")
-        spreadsheet_id = stored_settings['spreadsheet_id']
-    else:
+    if not spreadsheet_id:
         print("📊 No spreadsheet ID found. Please configure:")
         spreadsheet_id = input("Enter your Google Sheets ID: ").strip()
         if not spreadsheet_id:
-            print("❌ No spreadsheet ID provided, skipping sync")
-            return False
+            raise ConfigurationError("No spreadsheet ID provided")
 
     # Get sheet names - ask if not stored
-    if stored_settings['prices_sheet'] and stored_settings['shipping_sheet']:
-        prices_sheet = stored_settings['prices_sheet']
-        shipping_sheet = stored_settings['shipping_sheet']
-        print(f"📋 Using stored sheet names: Prices='{prices_sheet}', Shipping='{shipping_sheet}'")
-    else:
+    if not (prices_sheet and shipping_sheet):
         print("📋 Sheet names not configured. Please enter:")
         prices_sheet = input("Prices sheet name [Prices]: ").strip() or 'Prices'
         shipping_sheet = input("Shipping sheet name [Shipping]: ").strip() or 'Shipping'
 
-    # Save settings if any were entered
-    if not stored_settings['spreadsheet_id'] or not stored_settings['prices_sheet'] or not stored_settings[
-        'shipping_sheet']:
-        save_sheets_settings(db, spreadsheet_id, prices_sheet, shipping_sheet)
+    save_sheets_settings(db, spreadsheet_id, prices_sheet, shipping_sheet)
+    return {
+        'spreadsheet_id': spreadsheet_id,
+        'prices_sheet': prices_sheet,
+        'shipping_sheet': shipping_sheet
+    }
+
+def sync_sheets_data(sheets_handler, settings):
+    """Handle Google Sheets synchronization using complete settings."""
+    print("\n🔄 Google Sheets Synchronization")
+    print("=" * 50)
+
+    spreadsheet_id = settings['spreadsheet_id']
+    prices_sheet = settings['prices_sheet']
+    shipping_sheet = settings['shipping_sheet']
+    print(f"📊 Using spreadsheet ID: {spreadsheet_id[:10]}...")
+    print(f"📋 Using sheet names: Prices='{prices_sheet}', Shipping='{shipping_sheet}'")
 
     try:
         print(f"\n🚀 Starting sync for spreadsheet: {spreadsheet_id}")
@@ -271,9 +444,7 @@ def sync_sheets_data(sheets_handler, db):
 
     except Exception as e:
         print(f"❌ Sync failed: {e}")
-        if should_enable_dev_features():
-            import traceback
-            traceback.print_exc()
+        _maybe_trace()
         return False
 
 def run_setup_mode():
@@ -284,6 +455,7 @@ def run_setup_mode():
     try:
         # Initialize database
         print("🗄️  Initializing database connection...")
+        from modules.database_handler import DatabaseHandler
         db = DatabaseHandler()
 
         # Get current settings
@@ -318,8 +490,13 @@ def run_setup_mode():
             # Test the connection
             test_sync = input("\n🧪 Test sync with new settings? (y/N): ").strip().lower()
             if test_sync == 'y':
-                sheets_handler = GoogleSheetsHandler()
-                success = sync_sheets_data(sheets_handler, db)
+                from modules.google_sheets_handler import GoogleSheetsHandler
+                sheets_handler = GoogleSheetsHandler(db)
+                success = sync_sheets_data(sheets_handler, {
+                    'spreadsheet_id': new_spreadsheet_id,
+                    'prices_sheet': new_prices_sheet,
+                    'shipping_sheet': new_shipping_sheet
+                })
                 if success:
                     print("\n🎉 Test sync successful! You can now run in continuous mode.")
                 else:
@@ -329,69 +506,52 @@ def run_setup_mode():
 
     except Exception as e:
         print(f"\n❌ Setup failed: {e}")
-        if should_enable_dev_features():
-            import traceback
-            traceback.print_exc()
+        _maybe_trace()
 
-def sync_inventory_data(fio_handler, db):
+def sync_inventory_data(fio_handler, db, tracked_users=None):
     """Handle inventory synchronization for tracked users."""
     print("\n📦 Inventory Synchronization")
     print("=" * 50)
 
-    # Get list of users to sync
-    tracked_users = get_tracked_users(db)
+    # Get list of users to sync, unless the caller already has it
+    if tracked_users is None:
+        tracked_users = get_tracked_users(db)
 
     if not tracked_users:
         print("📋 No users configured for tracking.")
-        setup_users = input("Would you like to add users to track? (y/N): ").strip().lower()
-
-        if setup_users == 'y':
-            users_to_add = input("Enter usernames to track (comma-separated): ").strip()
-            if users_to_add:
-                new_users = [u.strip() for u in users_to_add.split(',') if u.strip()]
-                for user in new_users:
-                    db.upsert_player(user)
-                    print(f"✅ Added user: {user}")
-                tracked_users = new_users
-            else:
-                print("❌ No users provided, skipping inventory sync")
-                return False
-        else:
-            print("⏭️ Skipping inventory sync")
-            return False
+        print("⏭️ Skipping inventory sync (use --inventory to setup users)")
+        return False
 
     print(f"📋 Syncing inventory for {len(tracked_users)} users...")
 
     success_count = 0
     total_users = len(tracked_users)
 
-    for i, username in enumerate(tracked_users, 1):
-        print(f"\n👤 [{i}/{total_users}] Syncing: {username}")
-        print("-" * 30)
+    # FIO requests for all users overlap; database writes stay on this thread, in user order
+    with ThreadPoolExecutor(max_workers=FIO_MAX_WORKERS) as executor:
+        fetches = [executor.submit(db.fetch_user_inventory_data, fio_handler, username)
+                   for username in tracked_users]
 
-        try:
-            success = db.sync_user_inventory_data(fio_handler, username)
+        for i, (username, fetch) in enumerate(zip(tracked_users, fetches), 1):
+            print(f"\n👤 [{i}/{total_users}] Syncing: {username}")
+            print("-" * 30)
 
-            if success:
-                print(f"✅ {username}: Inventory synced successfully")
+            try:
+                totals = db.store_user_inventory_data(username, fetch.result())
 
-                # Show brief summary
-                summary = db.get_user_inventory_summary(username)
-                print(f"   📊 {summary['totals']['containers']} containers")
-                print(
-                    f"   🏪 Weight: {summary['totals']['total_weight_used']:.1f}/{summary['totals']['total_weight_capacity']:.1f}")
-                print(
-                    f"   📦 Volume: {summary['totals']['total_volume_used']:.1f}/{summary['totals']['total_volume_capacity']:.1f}")
+                if totals:
+                    print(f"✅ {username}: Inventory synced successfully")
 
-                success_count += 1
-            else:
-                print(f"❌ {username}: Sync failed")
+                    # Show brief summary
+                    print_inventory_totals(totals)
 
-        except Exception as e:
-            print(f"❌ {username}: Error during sync - {e}")
-            if should_enable_dev_features():
-                import traceback
-                traceback.print_exc()
+                    success_count += 1
+                else:
+                    print(f"❌ {username}: Sync failed")
+
+            except Exception as e:
+                print(f"❌ {username}: Error during sync - {e}")
+                _maybe_trace()
 
     print(f"\n📈 Inventory Sync Results:")
     print("=" * 30)
@@ -400,6 +560,93 @@ def sync_inventory_data(fio_handler, db):
 
     return success_count > 0
 
+def print_inventory_totals(totals):
+    """Print the brief inventory summary shown after a user's sync."""
+    print(f"   📊 {totals['containers']} containers")
+    print(f"   🏪 Weight: {totals['total_weight_used']:.1f}/{totals['total_weight_capacity']:.1f}")
+    print(f"   📦 Volume: {totals['total_volume_used']:.1f}/{totals['total_volume_capacity']:.1f}")
+
+def print_production_totals(totals):
+    """Print the brief production summary shown after a user's sync."""
+    print(f"   🏭 {totals['total_facilities']} facilities")
+    print(f"   📋 {totals['total_orders']} orders ({totals['active_orders']} active)")
+    print(f"   ⚡ Avg efficiency: {totals['avg_efficiency']:.1%}")
+    print(f"   🔧 Avg condition: {totals['avg_condition']:.1%}")
+
+def sync_tracked_users_data(fio_handler, db, tracked_users=None):
+    """Handle inventory and production synchronization for tracked users in a single pass."""
+    print("\n📦 Inventory & Production Synchronization")
+    print("=" * 50)
+
+    # Get list of users to sync, unless the caller already has it
+    if tracked_users is None:
+        tracked_users = get_tracked_users(db)
+
+    if not tracked_users:
+        print("📋 No users configured for tracking.")
+        print("⏭️ Skipping inventory and production sync (use --inventory to setup users)")
+        return False
+
+    print(f"📋 Syncing inventory and production for {len(tracked_users)} users...")
+
+    inventory_count = 0
+    production_count = 0
+    total_users = len(tracked_users)
+
+    # One FIO fetch per user runs on the pool; each user's writes are committed as one transaction
+    with ThreadPoolExecutor(max_workers=FIO_MAX_WORKERS) as executor:
+        fetches = [executor.submit(db.fetch_user_all_data, fio_handler, username)
+                   for username in tracked_users]
+
+        for i, (username, fetch) in enumerate(zip(tracked_users, fetches), 1):
+            print(f"\n👤 [{i}/{total_users}] Syncing: {username}")
+            print("-" * 30)
+
+            try:
+                inventory_totals, production_totals = db.store_user_all_data(username, fetch.result())
+
+                if inventory_totals:
+                    print(f"✅ {username}: Inventory synced successfully")
+                    print_inventory_totals(inventory_totals)
+                    inventory_count += 1
+                else:
+                    print(f"❌ {username}: Inventory sync failed")
+
+                if production_totals:
+                    print(f"✅ {username}: Production synced successfully")
+                    print_production_totals(production_totals)
+                    production_count += 1
+                else:
+                    print(f"❌ {username}: Production sync failed")
+
+            except Exception as e:
+                print(f"❌ {username}: Error during sync - {e}")
+                _maybe_trace()
+
+    print(f"\n📈 Inventory & Production Sync Results:")
+    print("=" * 30)
+    print(f"✅ Inventory: {inventory_count}/{total_users}")
+    print(f"✅ Production: {production_count}/{total_users}")
+
+    return inventory_count > 0 and production_count > 0
+
+def prompt_for_tracked_users(db):
+    """Offer to add users to track when none are configured. Returns the users added."""
+    setup_users = input("Would you like to add users to track? (y/N): ").strip().lower()
+    if setup_users != 'y':
+        return []
+
+    users_to_add = input("Enter usernames to track (comma-separated): ").strip()
+    new_users = [u.strip() for u in users_to_add.split(',') if u.strip()]
+    if not new_users:
+        print("❌ No users provided")
+        return []
+
+    db.batch_upsert_players(new_users)
+    for user in new_users:
+        print(f"✅ Added user: {user}")
+    return new_users
+
 def get_tracked_users(db):
     """Get list of users to track from the players table."""
     try:
@@ -407,13 +654,14 @@ def get_tracked_users(db):
     except Exception:
         return []
 
-def sync_production_data(fio_handler, db):
+def sync_production_data(fio_handler, db, tracked_users=None):
     """Handle production synchronization for tracked users."""
     print("\n⚗️ Production Synchronization")
     print("=" * 50)
 
-    # Get list of users to sync
-    tracked_users = get_tracked_users(db)
+    # Get list of users to sync, unless the caller already has it
+    if tracked_users is None:
+        tracked_users = get_tracked_users(db)
 
     if not tracked_users:
         print("📋 No users configured for tracking.")
@@ -425,32 +673,31 @@ def sync_production_data(fio_handler, db):
     success_count = 0
     total_users = len(tracked_users)
 
-    for i, username in enumerate(tracked_users, 1):
-        print(f"\n👤 [{i}/{total_users}] Syncing production: {username}")
-        print("-" * 30)
+    # FIO requests for all users overlap; database writes stay on this thread, in user order
+    with ThreadPoolExecutor(max_workers=FIO_MAX_WORKERS) as executor:
+        fetches = [executor.submit(db.fetch_user_production_data, fio_handler, username)
+                   for username in tracked_users]
 
-        try:
-            success = db.sync_user_production_data(fio_handler, username)
+        for i, (username, fetch) in enumerate(zip(tracked_users, fetches), 1):
+            print(f"\n👤 [{i}/{total_users}] Syncing production: {username}")
+            print("-" * 30)
 
-            if success:
-                print(f"✅ {username}: Production synced successfully")
+            try:
+                totals = db.store_user_production_data(username, fetch.result())
 
-                # Show brief summary
-                summary = db.get_user_production_summary(username)
-                print(f"   🏭 {summary['totals']['total_facilities']} facilities")
-                print(f"   📋 {summary['totals']['total_orders']} orders ({summary['totals']['active_orders']} active)")
-                print(f"   ⚡ Avg efficiency: {summary['totals']['avg_efficiency']:.1%}")
-                print(f"   🔧 Avg condition: {summary['totals']['avg_condition']:.1%}")
+                if totals:
+                    print(f"✅ {username}: Production synced successfully")
 
-                success_count += 1
-            else:
-                print(f"❌ {username}: Production sync failed")
+                    # Show brief summary
+                    print_production_totals(totals)
 
-        except Exception as e:
-            print(f"❌ {username}: Error during production sync - {e}")
-            if should_enable_dev_features():
-                import traceback
-                traceback.print_exc()
+                    success_count += 1
+                else:
+                    print(f"❌ {username}: Production sync failed")
+
+            except Exception as e:
+                print(f"❌ {username}: Error during production sync - {e}")
+                _maybe_trace()
 
     print(f"\n📈 Production Sync Results:")
     print("=" * 30)
@@ -473,15 +720,8 @@ def view_user_production_summary(db, username):
     if summary['facilities']:
         print(f"\n🏭 Production Facilities:")
 
-        # Group by planet for better display
-        by_planet = {}
-        for facility in summary['facilities']:
-            planet = facility['planet_name']
-            if planet not in by_planet:
-                by_planet[planet] = []
-            by_planet[planet].append(facility)
-
-        for planet, facilities in by_planet.items():
+        # Group by planet for better display; the query already orders facilities by planet
+        for planet, facilities in groupby(summary['facilities'], key=itemgetter('planet_name')):
             print(f"\n  🌍 {planet}")
             for facility in facilities:
                 print(f"    ⚗️ {facility['facility_type']} (Capacity: {facility['capacity']})")
@@ -491,14 +731,105 @@ def view_user_production_summary(db, username):
                     print(f"       Progress: {facility['avg_progress']:.1%} average")
                 print()
 
+def view_user_inventory_summary(db, username):
+    """Display detailed inventory summary for a user."""
+    summary = db.get_user_inventory_summary(username)
+
+    print(f"\n📊 Inventory Summary for {username}")
+    print("=" * 40)
+    print(f"Total Containers: {summary['totals']['containers']}")
+    print(
+        f"Total Weight: {summary['totals']['total_weight_used']:.1f}/{summary['totals']['total_weight_capacity']:.1f}")
+    print(
+        f"Total Volume: {summary['totals']['total_volume_used']:.1f}/{summary['totals']['total_volume_capacity']:.1f}")
+
+    print(f"\n📦 Storage Locations:")
+    for container in summary['containers']:
+        print(f"  🏪 {container['type']} at {container['location']}")
+        if container['name'] and container['name'] != 'None':
+            print(f"      Name: {container['name']}")
+        print(f"      Weight: {container['weight_used']:.1f}/{container['weight_capacity']:.1f}")
+        print(f"      Volume: {container['volume_used']:.1f}/{container['volume_capacity']:.1f}")
+        print(f"      Items: {container['unique_items']} types, {container['total_quantity']} total")
+        print()
+
+def _select_tracked_user(tracked_users, action):
+    """Prompt for one of the tracked users by number. Returns the username, or None."""
+    if not tracked_users:
+        print(f"❌ No users to {action}")
+        return None
+
+    print(f"Select user to {action}:")
+    for i, user in enumerate(tracked_users, 1):
+        print(f"  {i}. {user}")
+
+    try:
+        selection = int(input("Enter number: ").strip()) - 1
+    except ValueError:
+        print("❌ Please enter a valid number")
+        return None
+
+    if 0 <= selection < len(tracked_users):
+        return tracked_users[selection]
+    print("❌ Invalid selection")
+    return None
+
+def _add_tracked_user(db, tracked_users):
+    """Menu action: add a user. Returns True if the tracked users changed."""
+    username = input("Enter username to add: ").strip()
+    if not username:
+        print("❌ Invalid username")
+        return False
+
+    db.upsert_player(username)
+    print(f"✅ Added {username} to tracked users")
+    return True
+
+def _remove_tracked_user(db, tracked_users):
+    """Menu action: remove a user. Returns True if the tracked users changed."""
+    user_to_remove = _select_tracked_user(tracked_users, "remove")
+    if user_to_remove is None:
+        return False
+
+    if db.delete_player(user_to_remove):
+        print(f"✅ Removed {user_to_remove} from tracked users")
+        return True
+    print(f"❌ Failed to remove {user_to_remove}")
+    return False
+
+def _view_tracked_user_inventory(db, tracked_users):
+    """Menu action: show a user's inventory summary."""
+    username = _select_tracked_user(tracked_users, "view inventory")
+    if username is not None:
+        view_user_inventory_summary(db, username)
+    return False
+
+def _view_tracked_user_production(db, tracked_users):
+    """Menu action: show a user's production summary."""
+    username = _select_tracked_user(tracked_users, "view production")
+    if username is not None:
+        view_user_production_summary(db, username)
+    return False
+
+# Tracked users menu: choice -> (label, action(db, tracked_users) returning True if the list changed)
+# An action of None returns to the previous menu
+_TRACKED_USERS_MENU = {
+    '1': ("Add user", _add_tracked_user),
+    '2': ("Remove user", _remove_tracked_user),
+    '3': ("View user inventory summary", _view_tracked_user_inventory),
+    '4': ("View user production summary", _view_tracked_user_production),
+    '5': ("Return to main menu", None),
+}
+
 def manage_tracked_users_menu(db):
     """Interactive menu to manage tracked users."""
     print("\n👥 Manage Tracked Users")
     print("=" * 50)
 
-    while True:
-        tracked_users = get_tracked_users(db)
+    # Only re-read the list after it has been changed
+    tracked_users = get_tracked_users(db)
 
+    while True:
         print(f"\nCurrently tracking {len(tracked_users)} users:")
         for i, user in enumerate(tracked_users, 1):
             print(f"  {i}. {user}")
@@ -507,104 +838,98 @@ def manage_tracked_users_menu(db):
             print("  (No users currently tracked)")
 
         print(f"\nOptions:")
-        print("  1. Add user")
-        print("  2. Remove user")
-        print("  3. View user inventory summary")
-        print("  4. View user production summary")
-        print("  5. Return to main menu")
-
-        choice = input("\nEnter choice (1-5): ").strip()
-
-        if choice == '1':
-            username = input("Enter username to add: ").strip()
-            if username:
-                db.upsert_player(user)
-                print(f"✅ Added {username} to tracked users")
-            else:
-                print("❌ Invalid username")
-
-        elif choice == '2':
-            if not tracked_users:
-                print("❌ No users to remove")
-                continue
+        for key, (label, _) in _TRACKED_USERS_MENU.items():
+            print(f"  {key}. {label}")
 
-            print("Select user to remove:")
-            for i, user in enumerate(tracked_users, 1):
-                print(f"  {i}. {user}")
+        choice = input(f"\nEnter choice (1-{len(_TRACKED_USERS_MENU)}): ").strip()
+        if choice not in _TRACKED_USERS_MENU:
+            print(f"❌ Invalid choice. Please enter 1-{len(_TRACKED_USERS_MENU)}.")
+            continue
 
-            try:
-                selection = int(input("Enter number: ").strip()) - 1
-                if 0 <= selection < len(tracked_users):
-                    user_to_remove = tracked_users[selection]
-                    if db.delete_player(user_to_remove):
-                        print(f"✅ Removed {user_to_remove} from tracked users")
-                    else:
-                        print(f"❌ Failed to remove {user_to_remove}")
-                else:
-                    print("❌ Invalid selection")
-            except ValueError:
-                print("❌ Please enter a valid number")
-
-        elif choice == '3':
-            if not tracked_users:
-                print("❌ No users to view")
-                continue
-
-            print("Select user to view inventory:")
-            for i, user in enumerate(tracked_users, 1):
-                print(f"  {i}. {user}")
-
-            try:
-                selection = int(input("Enter number: ").strip()) - 1
-                if 0 <= selection < len(tracked_users):
-                    username = tracked_users[selection]
-                    summary = db.get_user_inventory_summary(username)
-
-                    print(f"\n📊 Inventory Summary for {username}")
-                    print("=" * 40)
-                    print(f"Total Containers: {summary['totals']['containers']}")
-                    print(
-                        f"Total Weight: {summary['totals']['total_weight_used']:.1f}/{summary['totals']['total_weight_capacity']:.1f}")
-                    print(
-                        f"Total Volume: {summary['totals']['total_volume_used']:.1f}/{summary['totals']['total_volume_capacity']:.1f}")
-
-                    print(f"\n📦 Storage Locations:")
-                    for container in summary['containers']:
-                        print(f"  🏪 {container['type']} at {container['location']}")
-                        if container['name'] and container['name'] != 'None':
-                            print(f"      Name: {container['name']}")
-                        print(f"      Weight: {container['weight_used']:.1f}/{container['weight_capacity']:.1f}")
-                        print(f"      Volume: {container['volume_used']:.1f}/{container['volume_capacity']:.1f}")
-                        print(f"      Items: {container['unique_items']} types, {container['total_quantity']} total")
-                        print()
-                else:
-                    print("❌ Invalid selection")
-            except ValueError:
-                print("❌ Please enter a valid number")
+        action = _TRACKED_USERS_MENU[choice][1]
+        if action is None:
+            break
+        if action(db, tracked_users):
+            tracked_users = get_tracked_users(db)
 
-        elif choice == '4':
-            if not tracked_users:
-                print("❌ No users to view")
-                continue
+def _report_sync(success, what):
+    """Print the outcome of a sync started from the setup menu."""
+    if success:
+        print(f"\n✅ {what} completed!")
+    else:
+        print(f"\n❌ {what} failed!")
 
-            print("Select user to view production:")
-            for i, user in enumerate(tracked_users, 1):
-                print(f"  {i}. {user}")
+def _sync_single_user(fio_handler, db, username, label):
+    """Sync inventory, production and consumption for one user and print a short summary."""
+    inventory_totals, production_totals = db.sync_user_all_data(fio_handler, username)
+    consumption_success = db.sync_user_consumption_data(fio_handler, username)
 
-            try:
-                selection = int(input("Enter number: ").strip()) - 1
-                if 0 <= selection < len(tracked_users):
-                    username = tracked_users[selection]
-                    view_user_production_summary(db, username)
-                else:
-                    print("❌ Invalid selection")
-            except ValueError:
-                print("❌ Please enter a valid number")
+    if inventory_totals and production_totals and consumption_success:
+        print(f"✅ {label} successful for {username}")
 
-        elif choice == '5':
-            break
-        else:
-            print("❌ Invalid choice. Please enter 1-5.")
+        # Show summaries
+        print(f"📊 Inventory: {inventory_totals['containers']} containers")
+        print(f"📊 Production: {production_totals['total_facilities']} facilities")
+    else:
+        print(f"❌ {label} had failures for {username}")
+        if not inventory_totals:
+            print("  - Inventory sync failed")
+        if not production_totals:
+            print("  - Production sync failed")
+        if not consumption_success:
+            print("  - Consumption sync failed")
+
+def _menu_manage_users(fio_handler, db):
+    """Menu action: manage tracked users."""
+    manage_tracked_users_menu(db)
+
+def _menu_full_sync(fio_handler, db):
+    """Menu action: sync inventory and production for all users."""
+    _report_sync(sync_tracked_users_data(fio_handler, db), "Full sync")
+
+def _menu_inventory_sync(fio_handler, db):
+    """Menu action: sync inventory for all users."""
+    _report_sync(sync_inventory_data(fio_handler, db), "Inventory sync")
+
+def _menu_production_sync(fio_handler, db):
+    """Menu action: sync production for all users."""
+    _report_sync(sync_production_data(fio_handler, db), "Production sync")
+
+def _menu_consumption_sync(fio_handler, db):
+    """Menu action: sync consumption for all users."""
+    _report_sync(sync_consumption_data(fio_handler, db), "Consumption sync")
+
+def _menu_sync_user(fio_handler, db):
+    """Menu action: sync everything for a username entered by the user."""
+    username = input("Enter username to sync: ").strip()
+    if not username:
+        print("❌ No username provided")
+        return
+
+    print(f"🔄 Syncing inventory, production and consumption for {username}...")
+    _sync_single_user(fio_handler, db, username, "Sync")
+
+def _menu_test_sync(fio_handler, db):
+    """Menu action: sync everything for the authenticated FIO user."""
+    current_user = fio_handler.get_username()
+    if not current_user:
+        print("❌ Could not get current user")
+        return
+
+    print(f"🔄 Testing sync with authenticated user: {current_user}")
+    _sync_single_user(fio_handler, db, current_user, "Test sync")
+
+# Inventory setup menu: choice -> (label, action(fio_handler, db)); an action of None returns to the main menu
+_INVENTORY_MENU = {
+    '1': ("Manage tracked users", _menu_manage_users),
+    '2': ("Run full sync (inventory + production) for all users", _menu_full_sync),
+    '3': ("Run inventory sync only for all users", _menu_inventory_sync),
+    '4': ("Run production sync only for all users", _menu_production_sync),
+    '5': ("Run consumption sync only for all users", _menu_consumption_sync),
+    '6': ("Sync specific user (inventory + production + consumption)", _menu_sync_user),
+    '7': ("Test sync with current FIO user", _menu_test_sync),
+    '8': ("Return to main menu", None),
+}
 
 def run_inventory_setup_mode():
     """Interactive setup mode for configuring inventory and production tracking."""
@@ -614,11 +939,13 @@ def run_inventory_setup_mode():
     try:
         # Initialize database
         print("🗄️ Initializing database connection...")
+        from modules.database_handler import DatabaseHandler
         db = DatabaseHandler()
 
         # Initialize FIO handler
         print("🌐 Initializing FIO API connection...")
-        fio_handler = FIOHandler()
+        from modules.fio_handler import FIOHandler
+        fio_handler = FIOHandler(db)
         if not fio_handler.is_authenticated():
             print("❌ FIO API authentication failed")
             return
@@ -632,118 +959,36 @@ def run_inventory_setup_mode():
                 print(f"  • {user}")
         else:
             print("\n👥 No users currently tracked")
+            prompt_for_tracked_users(db)
 
         # Menu loop
         while True:
             print("\n📋 Setup Options:")
-            print("  1. Manage tracked users")
-            print("  2. Run full sync (inventory + production) for all users")
-            print("  3. Run inventory sync only for all users")
-            print("  4. Run production sync only for all users")
-            print("  5. Run consumption sync only for all users")
-            print("  6. Sync specific user (inventory + production + consumption)")
-            print("  7. Test sync with current FIO user")
-            print("  8. Return to main menu")
-
-            choice = input("\nEnter choice (1-7): ").strip()
-
-            if choice == '1':
-                manage_tracked_users_menu(db)
-
-            elif choice == '2':
-                inventory_success = sync_inventory_data(fio_handler, db)
-                production_success = sync_production_data(fio_handler, db)
-                if inventory_success and production_success:
-                    print("\n✅ Full sync completed!")
-                else:
-                    print("\n❌ Sync had failures!")
+            for key, (label, _) in _INVENTORY_MENU.items():
+                print(f"  {key}. {label}")
 
-            elif choice == '3':
-                success = sync_inventory_data(fio_handler, db)
-                if success:
-                    print("\n✅ Inventory sync completed!")
-                else:
-                    print("\n❌ Inventory sync failed!")
-
-            elif choice == '4':
-                success = sync_production_data(fio_handler, db)
-                if success:
-                    print("\n✅ Production sync completed!")
-                else:
-                    print("\n❌ Production sync failed!")
-
-            elif choice == '5':
-                username = input("Enter username to sync: ").strip()
-                if username:
-                    print(f"🔄 Syncing inventory and production for {username}...")
-                    inventory_success = db.sync_user_inventory_data(fio_handler, username)
-                    production_success = db.sync_user_production_data(fio_handler, username)
-
-                    if inventory_success and production_success:
-                        print(f"✅ Successfully synced all data for {username}")
-
-                        # Show summaries
-                        inv_summary = db.get_user_inventory_summary(username)
-                        prod_summary = db.get_user_production_summary(username)
-                        print(f"📊 Inventory: {inv_summary['totals']['containers']} containers")
-                        print(f"📊 Production: {prod_summary['totals']['total_facilities']} facilities")
-                    else:
-                        print(f"❌ Sync had failures for {username}")
-                        if not inventory_success:
-                            print("  - Inventory sync failed")
-                        if not production_success:
-                            print("  - Production sync failed")
-                else:
-                    print("❌ No username provided")
-
-            elif choice == '6':
-                current_user = fio_handler.get_username()
-                if current_user:
-                    print(f"🔄 Testing sync with authenticated user: {current_user}")
-                    inventory_success = db.sync_user_inventory_data(fio_handler, current_user)
-                    production_success = db.sync_user_production_data(fio_handler, current_user)
-
-                    if inventory_success and production_success:
-                        print(f"✅ Test sync successful for {current_user}")
-
-                        # Show summaries
-                        inv_summary = db.get_user_inventory_summary(current_user)
-                        prod_summary = db.get_user_production_summary(current_user)
-                        print(f"📊 Inventory: {inv_summary['totals']['containers']} containers")
-                        print(f"📊 Production: {prod_summary['totals']['total_facilities']} facilities")
-                    else:
-                        print(f"❌ Test sync had failures for {current_user}")
-                        if not inventory_success:
-                            print("  - Inventory sync failed")
-                        if not production_success:
-                            print("  - Production sync failed")
-                else:
-                    print("❌ Could not get current user")
+            choice = input(f"\nEnter choice (1-{len(_INVENTORY_MENU)}): ").strip()
+            if choice not in _INVENTORY_MENU:
+                print(f"❌ Invalid choice. Please enter 1-{len(_INVENTORY_MENU)}.")
+                continue
 
-            elif choice == '7':
+            action = _INVENTORY_MENU[choice][1]
+            if action is None:
                 break
-            else:
-                print("❌ Invalid choice. Please enter 1-7.")
+            action(fio_handler, db)
 
     except Exception as e:
         print(f"\n❌ Setup failed: {e}")
-        if should_enable_dev_features():
-            import traceback
-            traceback.print_exc()
+        _maybe_trace()
 
-    except Exception as e:
-        print(f"\n❌ Setup failed: {e}")
-        if should_enable_dev_features():
-            import traceback
-            traceback.print_exc()
-
-def sync_consumption_data(fio_handler, db):
+def sync_consumption_data(fio_handler, db, tracked_users=None):
     """Handle consumption/burnrate synchronization for tracked users."""
     print("\n🔥 Consumption Synchronization")
     print("=" * 50)
 
-    # Get list of users to sync
-    tracked_users = get_tracked_users(db)
+    # Get list of users to sync, unless the caller already has it
+    if tracked_users is None:
+        tracked_users = get_tracked_users(db)
 
     if not tracked_users:
         print("📋 No users configured for tracking.")
@@ -778,9 +1023,7 @@ def sync_consumption_data(fio_handler, db):
 
         except Exception as e:
             print(f"❌ {username}: Error during consumption sync - {e}")
-            if should_enable_dev_features():
-                import traceback
-                traceback.print_exc()
+            _maybe_trace()
 
     print(f"\n📈 Consumption Sync Results:")
     print("=" * 30)
@@ -789,7 +1032,24 @@ def sync_consumption_data(fio_handler, db):
 
     return success_count > 0
 
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python main.py",
+        description="Prosperous Universe data sync. Runs continuous sync mode when no option is given."
+    )
+    # Each option stores the function to run in args.command; None means continuous sync
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("-s", "--setup", dest="command", action="store_const", const=run_setup_mode,
+                      help="run interactive Google Sheets setup mode")
+    mode.add_argument("--inventory", dest="command", action="store_const", const=run_inventory_setup_mode,
+                      help="run interactive inventory & production setup mode (manage tracked users)")
+    return parser.parse_args(argv)
+
 def main():
+    # Parse arguments first so --help returns before any handler is loaded
+    args = parse_args()
+
     # Generate version string
     version_string = get_version_string(APP_VERSION, APP_STATE)
     print(f"🚀 {APP_NAME} {version_string}")
@@ -801,20 +1061,21 @@ def main():
     if dev_features_enabled:
         print("🔧 Development features enabled")
 
-    # Check for command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ['--setup', '-s']:
-            run_setup_mode()
-            return
-        elif sys.argv[1] in ['--help', '-h']:
-            print("\nUsage:")
-            print("  python main.py           - Run continuous sync mode")
-            print("  python main.py --setup   - Run interactive setup mode")
-            print("  python main.py --help    - Show this help message")
-            return
+    # Sync progress is logged by the modules, both for the scheduler and the interactive commands
+    configure_progress_log()
+
+    if args.command:
+        args.command()
+        return
 
     try:
         # Initialize and run continuous sync
+        configure_error_log()
+
+        # Set up signal handlers for graceful shutdown, once, for the scheduler's lifetime
+        signal.signal(signal.SIGINT, _signal_handler)
+        signal.signal(signal.SIGTERM, _signal_handler)
+
         scheduler = SyncScheduler()
         scheduler.run_continuous_sync()
 
@@ -823,9 +1084,7 @@ def main():
 
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
-        if dev_features_enabled:
-            import traceback
-            traceback.print_exc()
+        _maybe_trace()
 
 
 if __name__ == "__main__":
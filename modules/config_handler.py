@@ -1,86 +1,201 @@
 # modules/config_handler.py
 
+import hashlib
 import json
-import mysql.connector
-from mysql.connector import Error
+import socket
+import time
 from pathlib import Path
+from types import MappingProxyType
+
+# Resolved once at import rather than on every ConfigHandler()
+_PROJECT_ROOT = Path(__file__).resolve().parents[1]
+_CONFIG_PATH = _PROJECT_ROOT / 'config.json'
+_MARKER_PATH = _PROJECT_ROOT / '.config.validated'
+
+# How long (in seconds) a successful login vouches for an unchanged config
+VALIDATION_TTL = 12 * 3600
+
+# Attempts get_config makes before giving up, so a service restart loop can't spin forever
+MAX_SETUP_ATTEMPTS = 3
+
+# (key, label, default, cast) for each setting prompted during setup
+_FIELDS = (
+    ("host", "Database Host", "localhost", str),
+    ("port", "Database Port", 3306, int),
+    ("database", "Database Name", "dev", str),
+    ("user", "Database Username", "root", str),
+    ("password", "Database Password", "", str),
+)
+
+# Connections kept open per pool unless config.json sets pool_size; every DatabaseHandler in the process draws from it
+POOL_SIZE = 5
+
+# Process-wide connection pools, one per distinct database config
+_pools = {}
+
+
+def _get_pool(cfg: dict):
+    """Return the shared pool for a config, opening its connections on first use."""
+    key = tuple(sorted(cfg.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        # Imported here so commands that never touch the database skip loading the driver
+        from mysql.connector.pooling import MySQLConnectionPool
+
+        # pool_size is a pool option, not a connection argument
+        cfg = dict(cfg)
+        pool_size = int(cfg.pop('pool_size', POOL_SIZE))
+
+        pool = MySQLConnectionPool(
+            pool_name=f"kawakeeper{len(_pools)}",
+            pool_size=pool_size,
+            pool_reset_session=False,
+            # Connections are shared between operations, so none may be left holding a read snapshot;
+            # multi-statement writes go through DatabaseHandler.transaction()
+            autocommit=True,
+            **cfg
+        )
+        _pools[key] = pool
+    return pool
+
+
+def _config_hash(cfg: dict) -> str:
+    """Fingerprint a config so the validation marker only matches the exact same settings."""
+    return hashlib.blake2b(json.dumps(cfg, sort_keys=True).encode(), digest_size=16).hexdigest()
+
 
 class ConfigHandler:
     def __init__(self):
-        self.project_root = Path(__file__).resolve().parents[1]
-        self.config_path = self.project_root / 'config.json'
+        self.project_root = _PROJECT_ROOT
+        self.config_path = _CONFIG_PATH
+        self.marker_path = _MARKER_PATH
         self.config = None
 
-    def prompt_config(self) -> dict:
-        # default values
-        defaults = {
-            "host": "localhost",
-            "port": 3306,
-            "database": "dev",
-            "user": "root",
-            "password": ""
-        }
+    @staticmethod
+    def _ask(label: str, default, cast=str):
+        """Prompt for one setting, returning the default on empty input and re-asking on bad input."""
+        while True:
+            raw = input(f"  • {label} [{default or '<empty>'}]: ").strip()
+            if not raw:
+                return default
+            try:
+                return cast(raw)
+            except ValueError:
+                print(f"❌  Invalid value for {label}: {raw}")
 
+    def prompt_config(self) -> dict:
         print("🔧  Database configuration setup:")
-        host    = input(f"  • Database Host [{defaults['host']}]: ").strip() or defaults['host']
-        port_in = input(f"  • Database Port [{defaults['port']}]: ").strip()
-        port    = int(port_in) if port_in else defaults['port']
-        name    = input(f"  • Database Name [{defaults['database']}]: ").strip() or defaults['database']
-        user    = input(f"  • Database Username [{defaults['user']}]: ").strip() or defaults['user']
-        pwd     = input(f"  • Database Password [{'<empty>' if not defaults['password'] else defaults['password']}]: ").strip() or defaults['password']
-
-        return {
-            "host": host,
-            "port": port,
-            "database": name,
-            "user": user,
-            "password": pwd
-        }
+        return {key: self._ask(label, default, cast) for key, label, default, cast in _FIELDS}
 
     def save_config(self, cfg: dict):
-        with open(self.config_path, 'w') as f:
-            json.dump(cfg, f, indent=2)
+        self.config_path.write_text(json.dumps(cfg, indent=2))
+        self.marker_path.unlink(missing_ok=True)
+        self.config = cfg
         print(f"✅  Saved config to {self.config_path}")
 
     def load_config(self) -> dict:
-        with open(self.config_path, 'r') as f:
-            return json.load(f)
+        """Return the config file contents, reading and parsing the file only once."""
+        if self.config is None:
+            self.config = json.loads(self.config_path.read_bytes())
+        return self.config
+
+    def _marker_valid(self, cfg: dict) -> bool:
+        """Return True if this exact config passed a full login within VALIDATION_TTL."""
+        try:
+            marker = json.loads(self.marker_path.read_bytes())
+        except (OSError, ValueError):
+            return False
+        return marker.get("h") == _config_hash(cfg) and marker.get("exp", 0) > time.time()
+
+    def _write_marker(self, cfg: dict):
+        """Record a successful login so restarts within the TTL can skip it."""
+        marker = {"h": _config_hash(cfg), "exp": time.time() + VALIDATION_TTL}
+        try:
+            self.marker_path.write_text(json.dumps(marker))
+        except OSError as e:
+            print(f"⚠️  Could not write {self.marker_path}: {e}")
 
     def validate_config(self, cfg: dict) -> bool:
+        from mysql.connector import Error
+
+        if self._marker_valid(cfg):
+            return True
+
+        # Fail fast on an unreachable host before opening the pool's connections
+        if not self._tcp_probe(cfg):
+            return False
+
         try:
-            conn = mysql.connector.connect(
-                host=cfg["host"],
-                port=cfg["port"],
-                database=cfg["database"],
-                user=cfg["user"],
-                password=cfg["password"],
-                connect_timeout=5
-            )
+            # Creating the pool logs in with the config; the checked-out connection goes back on close()
+            conn = _get_pool(cfg).get_connection()
             conn.close()
+            self._write_marker(cfg)
             return True
         except Error as e:
             print(f"❌  Connection failed: {e}")
             return False
 
+    def get_connection(self):
+        """Check a connection out of the shared pool; close() returns it."""
+        return _get_pool(self.get_config()).get_connection()
+
+    def _tcp_probe(self, cfg: dict) -> bool:
+        """Check that the database server accepts TCP connections, without logging in."""
+        try:
+            with socket.create_connection((cfg["host"], cfg["port"]), timeout=5):
+                return True
+        except OSError as e:
+            print(f"❌  Could not reach {cfg['host']}:{cfg['port']}: {e}")
+            return False
+
     def get_config(self) -> dict:
         """
         Load existing config or run interactive setup until valid.
         """
-        while True:
-            if not self.config_path.exists():
-                cfg = self.prompt_config()
-                self.save_config(cfg)
-            else:
+        if self.config is not None:
+            return self.config
+
+        retry_prompt = False
+        for _ in range(MAX_SETUP_ATTEMPTS):
+            # Open the file directly rather than checking exists() first
+            cfg = None
+            if not retry_prompt:
                 try:
                     cfg = self.load_config()
                     print(f"🔍  Loaded config from {self.config_path}")
+                except FileNotFoundError:
+                    pass
                 except (json.JSONDecodeError, IOError) as e:
                     print(f"❌  Failed to read config: {e}")
-                    cfg = self.prompt_config()
-                    self.save_config(cfg)
 
-            if self.validate_config(cfg):
+            prompted = cfg is None
+            if prompted:
+                cfg = self.prompt_config()
+                self.save_config(cfg)
+
+            # Freshly typed credentials get a full login. A saved config that logged in
+            # recently needs no check at all; otherwise the server only has to be reachable,
+            # since the caller logs in right after this anyway
+            if prompted:
+                valid = self.validate_config(cfg)
+            else:
+                valid = self._marker_valid(cfg) or self._tcp_probe(cfg)
+            if valid:
                 self.config = cfg
                 return cfg
 
+            # Rejected credentials are asked for again; an unreachable saved config is re-read
+            self.config = None
+            retry_prompt = prompted
             print("🔄  Invalid config; let's try again.\n")
+
+        raise RuntimeError(f"No working database configuration after {MAX_SETUP_ATTEMPTS} attempts")
+
+    def reload(self) -> dict:
+        """Drop the cached config and load it from disk again."""
+        self.config = None
+        return self.get_config()
+
+    def snapshot(self) -> MappingProxyType:
+        """Return a read-only view of the validated config, safe to share between handlers."""
+        return MappingProxyType(self.get_config())
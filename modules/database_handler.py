@@ -1,28 +1,421 @@
 # modules/database_handler.py
 
-import mysql.connector
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
 from modules.config_handler import ConfigHandler
 
+# Sync progress and failures; main.py prints them to the console and keeps warnings and errors in sync.log
+log = logging.getLogger(__name__)
+
+# CREATE TABLE statement for each table, parents before the tables whose foreign keys reference them
+_TABLE_DDL = {
+    # Existing settings tables
+    'settings': """
+        CREATE TABLE IF NOT EXISTS settings (
+            setting_name VARCHAR(255) PRIMARY KEY,
+            setting_value BLOB NOT NULL
+        );
+    """,
+
+    'guild_settings': """
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id BIGINT NOT NULL,
+            setting_name VARCHAR(255) NOT NULL,
+            setting_value BLOB NOT NULL,
+            PRIMARY KEY (guild_id, setting_name)
+        );
+    """,
+
+    # Prosperous Universe tables
+    'locations': """
+        CREATE TABLE IF NOT EXISTS locations (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        );
+    """,
+
+    'items': """
+        CREATE TABLE IF NOT EXISTS items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            ticker VARCHAR(10) UNIQUE NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            category VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        );
+    """,
+
+    'prices': """
+        CREATE TABLE IF NOT EXISTS prices (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            ticker VARCHAR(10) NOT NULL,
+            location VARCHAR(255) NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            is_default BOOLEAN DEFAULT FALSE,
+            last_updated DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_ticker_location (ticker, location),
+            FOREIGN KEY (ticker) REFERENCES items(ticker) ON UPDATE CASCADE,
+            FOREIGN KEY (location) REFERENCES locations(name) ON UPDATE CASCADE
+        );
+    """,
+
+    'shipping': """
+        CREATE TABLE IF NOT EXISTS shipping (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            from_location VARCHAR(255) NOT NULL,
+            to_location VARCHAR(255) NOT NULL,
+            cost DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_route (from_location, to_location),
+            FOREIGN KEY (from_location) REFERENCES locations(name) ON UPDATE CASCADE,
+            FOREIGN KEY (to_location) REFERENCES locations(name) ON UPDATE CASCADE
+        );
+    """,
+
+    # NEW INVENTORY TABLES
+    # Players/Users table
+    'players': """
+        CREATE TABLE IF NOT EXISTS players (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """,
+
+    # Planets table (for location mapping)
+    'planets': """
+        CREATE TABLE IF NOT EXISTS planets (
+            id VARCHAR(36) PRIMARY KEY,  -- Planet ID from FIO API
+            identifier VARCHAR(50),      -- Planet identifier like "UV-351a"
+            name VARCHAR(255) NOT NULL,  -- Planet name like "Katoa"
+            founded_epoch_ms BIGINT,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """,
+
+    # Sites table (bases on planets)
+    'sites': """
+        CREATE TABLE IF NOT EXISTS sites (
+            id VARCHAR(36) PRIMARY KEY,  -- Site ID from FIO API
+            planet_id VARCHAR(36),
+            username VARCHAR(255) NOT NULL,
+            invested_permits INT DEFAULT 0,
+            maximum_permits INT DEFAULT 3,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (planet_id) REFERENCES planets(id) ON UPDATE CASCADE,
+            FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
+        );
+    """,
+
+    # Ships table
+    'ships': """
+        CREATE TABLE IF NOT EXISTS ships (
+            addressable_id VARCHAR(36) PRIMARY KEY,  -- Ship's location ID
+            name VARCHAR(255) NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
+        );
+    """,
+
+    # Storage containers table
+    'storage_containers': """
+        CREATE TABLE IF NOT EXISTS storage_containers (
+            storage_id VARCHAR(36) PRIMARY KEY,  -- Storage ID from FIO API
+            addressable_id VARCHAR(36),          -- Location ID (links to ships/sites)
+            username VARCHAR(255) NOT NULL,
+            container_name VARCHAR(255),         -- Name (for ships) or NULL
+            storage_type ENUM('FTL_FUEL_STORE', 'STL_FUEL_STORE', 'SHIP_STORE', 'WAREHOUSE_STORE', 'STORE') NOT NULL,
+            weight_capacity DECIMAL(10,2) DEFAULT 0,
+            weight_load DECIMAL(10,2) DEFAULT 0,
+            volume_capacity DECIMAL(10,2) DEFAULT 0,
+            volume_load DECIMAL(10,2) DEFAULT 0,
+            fixed_store BOOLEAN DEFAULT FALSE,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
+        );
+    """,
+
+    # Inventory items table
+    'inventory_items': """
+        CREATE TABLE IF NOT EXISTS inventory_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            storage_id VARCHAR(36) NOT NULL,      -- Links to storage_containers
+            material_id VARCHAR(36) NOT NULL,     -- Material ID from FIO API
+            material_ticker VARCHAR(10) NOT NULL,
+            material_name VARCHAR(255) NOT NULL,
+            material_category VARCHAR(36),
+            amount INT NOT NULL DEFAULT 0,
+            material_weight DECIMAL(8,5) DEFAULT 0,
+            material_volume DECIMAL(8,5) DEFAULT 0,
+            total_weight DECIMAL(10,2) DEFAULT 0,
+            total_volume DECIMAL(10,2) DEFAULT 0,
+            material_value DECIMAL(10,2) DEFAULT 0,
+            material_value_currency VARCHAR(3) DEFAULT 'CIS',
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_storage_material (storage_id, material_id),
+            FOREIGN KEY (storage_id) REFERENCES storage_containers(storage_id) ON DELETE CASCADE,
+            FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
+        );
+    """,
+
+    # Production facilities table
+    'production_facilities': """
+        CREATE TABLE IF NOT EXISTS production_facilities (
+            production_line_id VARCHAR(36) PRIMARY KEY,
+            site_id VARCHAR(36),
+            planet_id VARCHAR(36),
+            planet_natural_id VARCHAR(50),
+            planet_name VARCHAR(255),
+            username VARCHAR(255) NOT NULL,
+            facility_type VARCHAR(100),
+            capacity INT DEFAULT 0,
+            efficiency DECIMAL(6,5) DEFAULT 0,
+            facility_condition DECIMAL(6,5) DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE,
+            FOREIGN KEY (site_id) REFERENCES sites(id) ON UPDATE CASCADE,
+            FOREIGN KEY (planet_id) REFERENCES planets(id) ON UPDATE CASCADE
+        );
+    """,
+
+    # Production orders table
+    'production_orders': """
+        CREATE TABLE IF NOT EXISTS production_orders (
+            order_id VARCHAR(36) PRIMARY KEY,
+            production_line_id VARCHAR(36) NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            created_epoch_ms BIGINT,
+            started_epoch_ms BIGINT,
+            completion_epoch_ms BIGINT,
+            duration_ms BIGINT,
+            last_updated_epoch_ms BIGINT,
+            completed_percentage DECIMAL(8,7) DEFAULT 0,
+            is_halted BOOLEAN DEFAULT FALSE,
+            recurring BOOLEAN DEFAULT FALSE,
+            standard_recipe_name VARCHAR(255),
+            production_fee DECIMAL(10,4) DEFAULT 0,
+            production_fee_currency VARCHAR(3) DEFAULT 'NCC',
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (production_line_id) REFERENCES production_facilities(production_line_id) ON DELETE CASCADE,
+            FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
+        );
+    """,
+
+    # Production order inputs table (materials consumed)
+    'production_order_inputs': """
+        CREATE TABLE IF NOT EXISTS production_order_inputs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            order_id VARCHAR(36) NOT NULL,
+            material_id VARCHAR(36),
+            material_ticker VARCHAR(10),
+            material_name VARCHAR(255),
+            amount INT DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (order_id) REFERENCES production_orders(order_id) ON DELETE CASCADE,
+            FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
+        );
+    """,
+
+    # Production order outputs table (materials produced)
+    'production_order_outputs': """
+        CREATE TABLE IF NOT EXISTS production_order_outputs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            order_id VARCHAR(36) NOT NULL,
+            material_id VARCHAR(36),
+            material_ticker VARCHAR(10),
+            material_name VARCHAR(255),
+            amount INT DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (order_id) REFERENCES production_orders(order_id) ON DELETE CASCADE,
+            FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
+        );
+    """,
+
+    # Burn data table
+    'consumption_rates': """
+        CREATE TABLE IF NOT EXISTS consumption_rates (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) NOT NULL,
+            planet_natural_id VARCHAR(50),
+            planet_name VARCHAR(255),
+            material_ticker VARCHAR(10) NOT NULL,
+            daily_consumption DECIMAL(10,3) NOT NULL DEFAULT 0,
+            is_essential BOOLEAN DEFAULT FALSE,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            INDEX idx_username (username),
+            INDEX idx_planet_natural_id (planet_natural_id),
+            INDEX idx_material_ticker (material_ticker),
+            INDEX idx_username_planet_ticker (username, planet_natural_id, material_ticker),
+
+            FOREIGN KEY (username) REFERENCES players(username) ON DELETE CASCADE,
+            FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
+        );
+    """,
+}
+
+# Tables created by _ensure_tables
+_TABLE_NAMES = tuple(_TABLE_DDL)
+
+# Set once the schema has been checked, so later DatabaseHandler instances in the process skip it
+_TABLES_ENSURED = False
+
 
 class DatabaseHandler:
+    # Seconds a cached price, shipping, item, location or guild setting lookup stays valid
+    LOOKUP_CACHE_TTL = 300
+
+    # Limits of items.ticker (VARCHAR(10)) and consumption_rates.daily_consumption (DECIMAL(10,3))
+    MAX_TICKER_LENGTH = 10
+    MAX_DAILY_CONSUMPTION = 10 ** 7
+
     def __init__(self):
-        config_handler = ConfigHandler()
-        self.db_cfg = config_handler.get_config()
-        self._conn = None
+        self._config_handler = ConfigHandler()
+        self.db_cfg = self._config_handler.snapshot()
+        self._local = threading.local()  # .conn and .on_commit belong to the open transaction() of each thread
+        self._settings_cache = {}  # setting_name -> decoded value
+        self._lookup_cache = {}  # table -> {key: (value, expires_at)}
+        self._written_items = {}  # ticker -> (name, category) last written to the items table
         self._ensure_tables()
+        self._preload_settings()
+
+    @contextmanager
+    def _acquire(self):
+        """Check out a pooled connection for one operation, or reuse the one an open transaction() holds."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
 
-    def _connect(self):
-        if self._conn is None or not self._conn.is_connected():
-            self._conn = mysql.connector.connect(
-                host=self.db_cfg["host"],
-                port=self.db_cfg["port"],
-                database=self.db_cfg["database"],
-                user=self.db_cfg["user"],
-                password=self.db_cfg["password"],
-            )
-        return self._conn
+        conn = self._config_handler.get_connection()
+        try:
+            yield conn
+        finally:
+            # Returns the connection to the pool, which reconnects it if it has dropped
+            conn.close()
+
+    @contextmanager
+    def _cursor(self):
+        """Open a cursor on a connection from _acquire(), closing it even if the block raises."""
+        with self._acquire() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def transaction(self, read_only: bool = False):
+        """
+        Group the writes made inside the block into a single commit, rolled back if the block raises.
+        Nested blocks become savepoints of the enclosing transaction. A read_only block reads from
+        one consistent snapshot without taking locks; it is ignored when nested.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # A nested block runs as a savepoint, so a failure inside it only undoes its own writes
+            self._local.depth += 1
+            savepoint = f"sp{self._local.depth}"
+            pending = len(self._local.on_commit)
+            cursor = conn.cursor()
+            cursor.execute(f"SAVEPOINT {savepoint};")
+            try:
+                yield conn
+                cursor.execute(f"RELEASE SAVEPOINT {savepoint};")
+            except Exception:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint};")
+                # Cache updates queued by the undone writes must not be applied
+                del self._local.on_commit[pending:]
+                raise
+            finally:
+                cursor.close()
+                self._local.depth -= 1
+            return
+
+        with self._acquire() as conn:
+            conn.start_transaction(readonly=read_only)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.on_commit = []
+            try:
+                yield conn
+                conn.commit()
+                for action, args in self._local.on_commit:
+                    action(*args)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._local.conn = None
+                self._local.on_commit = []
+
+    def _after_commit(self, action, *args) -> None:
+        """
+        Run action(*args) once the open transaction() commits, or straight away outside one.
+        Used for cache updates, which are dropped if the writes they mirror are rolled back.
+        """
+        if getattr(self._local, 'conn', None) is None:
+            action(*args)
+        else:
+            self._local.on_commit.append((action, args))
+
+    def _cached(self, table: str, key, load):
+        """Return a cached lookup against a table, calling load() on a miss or once it has expired."""
+        # Inside a transaction() reads may see uncommitted writes, so they bypass the cache
+        if getattr(self._local, 'conn', None) is not None:
+            return load()
+
+        entries = self._lookup_cache.setdefault(table, {})
+        entry = entries.get(key)
+        now = time.monotonic()
+        if entry and entry[1] > now:
+            return entry[0]
+
+        value = load()
+        entries[key] = (value, now + self.LOOKUP_CACHE_TTL)
+        return value
+
+    def _invalidate(self, table: str) -> None:
+        """Drop every cached lookup against a table after writing to it."""
+        self._lookup_cache.pop(table, None)
+        # Other threads can cache the old rows again until the write commits, so drop them once more then
+        self._after_commit(self._lookup_cache.pop, table, None)
+
+    def _delete_where_in(self, table: str, column: str, values: list) -> None:
+        """Delete the rows of a table whose column matches any of the given values."""
+        if not values:
+            return
+
+        with self._cursor() as cursor:
+            placeholders = ", ".join(["%s"] * len(values))
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders});", tuple(values))
 
     def _ensure_tables(self):
+        global _TABLES_ENSURED
+        if _TABLES_ENSURED:
+            return
+
         import os
         from modules.constants import DB_HARD_DROP, DB_SOFT_DROP, DB_TABLES, APP_STATE
 
@@ -34,346 +427,146 @@ class DatabaseHandler:
         use_hard_drop = DB_HARD_DROP and dev_features_enabled
         use_soft_drop = DB_SOFT_DROP and dev_features_enabled
 
-        conn = self._connect()
-        cursor = conn.cursor()
+        with self._cursor() as cursor:
+            # Handle database drops
+            if use_hard_drop:
+                # Drop all tables
+                cursor.execute("SHOW TABLES;")
+                tables = [row[0] for row in cursor.fetchall()]
+                self._drop_tables(cursor, tables)
+                print(f"Hard drop: Dropped {len(tables)} tables")
+
+            elif use_soft_drop and DB_TABLES:
+                # Drop only specified tables
+                self._drop_tables(cursor, DB_TABLES)
+                print(f"Soft drop: Dropped {len(DB_TABLES)} specified tables")
+
+            # Every table already exists on all but a fresh database, so one lookup usually replaces the DDL
+            placeholders = ", ".join(["%s"] * len(_TABLE_NAMES))
+            cursor.execute(f"""
+                SELECT COUNT(*) FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND table_name IN ({placeholders});
+            """, _TABLE_NAMES)
+            if cursor.fetchone()[0] < len(_TABLE_NAMES):
+                self._create_tables(cursor)
+
+        _TABLES_ENSURED = True
+
+    def _drop_tables(self, cursor, tables: list) -> None:
+        """Drop the given tables in one statement, with foreign key checks off so their order doesn't matter."""
+        if not tables:
+            return
+
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+        try:
+            cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"`{table}`" for table in tables) + ";")
+        finally:
+            # The connection goes back to the pool, so the session setting must not leak
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+
+    def _create_tables(self, cursor):
+        """Create the application tables that do not exist yet."""
+        for ddl in _TABLE_DDL.values():
+            cursor.execute(ddl)
 
-        # Handle database drops
-        if use_hard_drop:
-            # Drop all tables
+    def get_tables(self):
+        with self._cursor() as cursor:
             cursor.execute("SHOW TABLES;")
             tables = [row[0] for row in cursor.fetchall()]
-            for table in tables:
-                cursor.execute(f"DROP TABLE IF EXISTS `{table}`;")
-            print(f"Hard drop: Dropped {len(tables)} tables")
-
-        elif use_soft_drop and DB_TABLES:
-            # Drop only specified tables
-            dropped_count = 0
-            for table in DB_TABLES:
-                cursor.execute(f"DROP TABLE IF EXISTS `{table}`;")
-                dropped_count += 1
-            print(f"Soft drop: Dropped {dropped_count} specified tables")
-
-        # Existing settings tables
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                setting_name VARCHAR(255) PRIMARY KEY,
-                setting_value BLOB NOT NULL
-            );
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS guild_settings (
-                guild_id BIGINT NOT NULL,
-                setting_name VARCHAR(255) NOT NULL,
-                setting_value BLOB NOT NULL,
-                PRIMARY KEY (guild_id, setting_name)
-            );
-        """)
-
-        # Prosperous Universe tables
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS locations (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            );
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                ticker VARCHAR(10) UNIQUE NOT NULL,
-                name VARCHAR(255) NOT NULL,
-                category VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            );
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS prices (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                ticker VARCHAR(10) NOT NULL,
-                location VARCHAR(255) NOT NULL,
-                price DECIMAL(10,2) NOT NULL,
-                is_default BOOLEAN DEFAULT FALSE,
-                last_updated DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                UNIQUE KEY unique_ticker_location (ticker, location),
-                FOREIGN KEY (ticker) REFERENCES items(ticker) ON UPDATE CASCADE,
-                FOREIGN KEY (location) REFERENCES locations(name) ON UPDATE CASCADE
-            );
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS shipping (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                from_location VARCHAR(255) NOT NULL,
-                to_location VARCHAR(255) NOT NULL,
-                cost DECIMAL(10,2) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                UNIQUE KEY unique_route (from_location, to_location),
-                FOREIGN KEY (from_location) REFERENCES locations(name) ON UPDATE CASCADE,
-                FOREIGN KEY (to_location) REFERENCES locations(name) ON UPDATE CASCADE
-            );
-        """)
-
-        # NEW INVENTORY TABLES
-
-        # Players/Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS players (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        # Planets table (for location mapping)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS planets (
-                id VARCHAR(36) PRIMARY KEY,  -- Planet ID from FIO API
-                identifier VARCHAR(50),      -- Planet identifier like "UV-351a"
-                name VARCHAR(255) NOT NULL,  -- Planet name like "Katoa"
-                founded_epoch_ms BIGINT,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        # Sites table (bases on planets)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sites (
-                id VARCHAR(36) PRIMARY KEY,  -- Site ID from FIO API
-                planet_id VARCHAR(36),
-                username VARCHAR(255) NOT NULL,
-                invested_permits INT DEFAULT 0,
-                maximum_permits INT DEFAULT 3,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (planet_id) REFERENCES planets(id) ON UPDATE CASCADE,
-                FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
-            );
-        """)
-
-        # Ships table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ships (
-                addressable_id VARCHAR(36) PRIMARY KEY,  -- Ship's location ID
-                name VARCHAR(255) NOT NULL,
-                username VARCHAR(255) NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
-            );
-        """)
-
-        # Storage containers table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS storage_containers (
-                storage_id VARCHAR(36) PRIMARY KEY,  -- Storage ID from FIO API
-                addressable_id VARCHAR(36),          -- Location ID (links to ships/sites)
-                username VARCHAR(255) NOT NULL,
-                container_name VARCHAR(255),         -- Name (for ships) or NULL
-                storage_type ENUM('FTL_FUEL_STORE', 'STL_FUEL_STORE', 'SHIP_STORE', 'WAREHOUSE_STORE', 'STORE') NOT NULL,
-                weight_capacity DECIMAL(10,2) DEFAULT 0,
-                weight_load DECIMAL(10,2) DEFAULT 0,
-                volume_capacity DECIMAL(10,2) DEFAULT 0,
-                volume_load DECIMAL(10,2) DEFAULT 0,
-                fixed_store BOOLEAN DEFAULT FALSE,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
-            );
-        """)
-
-        # Inventory items table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS inventory_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                storage_id VARCHAR(36) NOT NULL,      -- Links to storage_containers
-                material_id VARCHAR(36) NOT NULL,     -- Material ID from FIO API
-                material_ticker VARCHAR(10) NOT NULL,
-                material_name VARCHAR(255) NOT NULL,
-                material_category VARCHAR(36),
-                amount INT NOT NULL DEFAULT 0,
-                material_weight DECIMAL(8,5) DEFAULT 0,
-                material_volume DECIMAL(8,5) DEFAULT 0,
-                total_weight DECIMAL(10,2) DEFAULT 0,
-                total_volume DECIMAL(10,2) DEFAULT 0,
-                material_value DECIMAL(10,2) DEFAULT 0,
-                material_value_currency VARCHAR(3) DEFAULT 'CIS',
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY unique_storage_material (storage_id, material_id),
-                FOREIGN KEY (storage_id) REFERENCES storage_containers(storage_id) ON DELETE CASCADE,
-                FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
-            );
-        """)
-
-        # Production facilities table
-        cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS production_facilities (
-                        production_line_id VARCHAR(36) PRIMARY KEY,
-                        site_id VARCHAR(36),
-                        planet_id VARCHAR(36),
-                        planet_natural_id VARCHAR(50),
-                        planet_name VARCHAR(255),
-                        username VARCHAR(255) NOT NULL,
-                        facility_type VARCHAR(100),
-                        capacity INT DEFAULT 0,
-                        efficiency DECIMAL(6,5) DEFAULT 0,
-                        facility_condition DECIMAL(6,5) DEFAULT 0,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE,
-                        FOREIGN KEY (site_id) REFERENCES sites(id) ON UPDATE CASCADE,
-                        FOREIGN KEY (planet_id) REFERENCES planets(id) ON UPDATE CASCADE
-                    );
-                """)
-
-        # Production orders table
-        cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS production_orders (
-                        order_id VARCHAR(36) PRIMARY KEY,
-                        production_line_id VARCHAR(36) NOT NULL,
-                        username VARCHAR(255) NOT NULL,
-                        created_epoch_ms BIGINT,
-                        started_epoch_ms BIGINT,
-                        completion_epoch_ms BIGINT,
-                        duration_ms BIGINT,
-                        last_updated_epoch_ms BIGINT,
-                        completed_percentage DECIMAL(8,7) DEFAULT 0,
-                        is_halted BOOLEAN DEFAULT FALSE,
-                        recurring BOOLEAN DEFAULT FALSE,
-                        standard_recipe_name VARCHAR(255),
-                        production_fee DECIMAL(10,4) DEFAULT 0,
-                        production_fee_currency VARCHAR(3) DEFAULT 'NCC',
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (production_line_id) REFERENCES production_facilities(production_line_id) ON DELETE CASCADE,
-                        FOREIGN KEY (username) REFERENCES players(username) ON UPDATE CASCADE
-                    );
-                """)
-
-        # Production order inputs table (materials consumed)
-        cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS production_order_inputs (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        order_id VARCHAR(36) NOT NULL,
-                        material_id VARCHAR(36),
-                        material_ticker VARCHAR(10),
-                        material_name VARCHAR(255),
-                        amount INT DEFAULT 0,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (order_id) REFERENCES production_orders(order_id) ON DELETE CASCADE,
-                        FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
-                    );
-                """)
-
-        # Production order outputs table (materials produced)
-        cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS production_order_outputs (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        order_id VARCHAR(36) NOT NULL,
-                        material_id VARCHAR(36),
-                        material_ticker VARCHAR(10),
-                        material_name VARCHAR(255),
-                        amount INT DEFAULT 0,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (order_id) REFERENCES production_orders(order_id) ON DELETE CASCADE,
-                        FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
-                    );
-                """);
-
-        # Burn data table
-        cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS consumption_rates (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        username VARCHAR(255) NOT NULL,
-                        planet_natural_id VARCHAR(50),
-                        planet_name VARCHAR(255),
-                        material_ticker VARCHAR(10) NOT NULL,
-                        daily_consumption DECIMAL(10,3) NOT NULL DEFAULT 0,
-                        is_essential BOOLEAN DEFAULT FALSE,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        
-                        INDEX idx_username (username),
-                        INDEX idx_planet_natural_id (planet_natural_id),
-                        INDEX idx_material_ticker (material_ticker),
-                        INDEX idx_username_planet_ticker (username, planet_natural_id, material_ticker),
-                        
-                        FOREIGN KEY (username) REFERENCES players(username) ON DELETE CASCADE,
-                        FOREIGN KEY (material_ticker) REFERENCES items(ticker) ON UPDATE CASCADE
-                    );
-                """);
-
-
-
-        conn.commit()
-        cursor.close()
+            return tables
 
-    def get_tables(self):
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SHOW TABLES;")
-        tables = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        return tables
-
-    def get_setting(self, name: str) -> bytes | None:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT setting_value FROM settings WHERE setting_name = %s;",
-            (name,)
-        )
-        row = cursor.fetchone()
-        cursor.close()
-        return row[0] if row else None
-
-    def upsert_setting(self, name: str, value: bytes) -> None:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO settings (setting_name, setting_value)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE
-              setting_value = VALUES(setting_value);
-        """, (name, value))
-        conn.commit()
-        cursor.close()
+    def _preload_settings(self) -> None:
+        """Fill the settings cache with every stored setting in one query."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT setting_name, setting_value FROM settings;")
+            self._settings_cache.update((name, value.decode('utf-8')) for name, value in cursor.fetchall())
+
+    def get_setting(self, name: str) -> str | None:
+        """Get a setting decoded as UTF-8 text, or None if it is not set."""
+        if name in self._settings_cache:
+            return self._settings_cache[name]
+
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT setting_value FROM settings WHERE setting_name = %s;",
+                (name,)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            value = row[0].decode('utf-8')
+            self._after_commit(self._settings_cache.update, {name: value})
+            return value
+
+    def upsert_setting(self, name: str, value: str) -> None:
+        """Insert or update a text setting."""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO settings (setting_name, setting_value)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                  setting_value = VALUES(setting_value);
+            """, (name, value.encode('utf-8')))
+            self._after_commit(self._settings_cache.update, {name: value})
+
+    def get_settings(self, names: list) -> dict:
+        """Get several text settings in one query. Missing settings are left out of the result."""
+        settings = {name: self._settings_cache[name] for name in names if name in self._settings_cache}
+        missing = [name for name in names if name not in settings]
+        if not missing:
+            return settings
+
+        with self._cursor() as cursor:
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(
+                f"SELECT setting_name, setting_value FROM settings WHERE setting_name IN ({placeholders});",
+                tuple(missing)
+            )
+            rows = cursor.fetchall()
+
+            for name, value in rows:
+                settings[name] = value.decode('utf-8')
+            self._after_commit(self._settings_cache.update, dict(settings))
+            return settings
+
+    def upsert_settings(self, settings: dict) -> None:
+        """Insert or update several text settings in a single statement."""
+        if not settings:
+            return
+
+        with self._cursor() as cursor:
+            placeholders = ", ".join(["(%s, %s)"] * len(settings))
+            params = [field for name, value in settings.items() for field in (name, value.encode('utf-8'))]
+            cursor.execute(f"""
+                INSERT INTO settings (setting_name, setting_value)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                  setting_value = VALUES(setting_value);
+            """, params)
+            self._after_commit(self._settings_cache.update, dict(settings))
 
     def get_guild_setting(self, guild_id: int, name: str) -> bytes | None:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT setting_value FROM guild_settings WHERE guild_id = %s AND setting_name = %s;",
-            (guild_id, name)
-        )
-        row = cursor.fetchone()
-        cursor.close()
-        return row[0] if row else None
+        def load():
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "SELECT setting_value FROM guild_settings WHERE guild_id = %s AND setting_name = %s;",
+                    (guild_id, name)
+                )
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+        return self._cached('guild_settings', (guild_id, name), load)
 
     def upsert_guild_setting(self, guild_id: int, name: str, value: bytes) -> None:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO guild_settings (guild_id, setting_name, setting_value)
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-              setting_value = VALUES(setting_value);
-        """, (guild_id, name, value))
-        conn.commit()
-        cursor.close()
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO guild_settings (guild_id, setting_name, setting_value)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                  setting_value = VALUES(setting_value);
+            """, (guild_id, name, value))
+            self._invalidate('guild_settings')
 
     # === Prosperous Universe specific methods ===
 
@@ -382,105 +575,98 @@ class DatabaseHandler:
         if not locations:
             return
 
-        conn = self._connect()
-        cursor = conn.cursor()
-
-        # Remove duplicates while preserving order
-        unique_locations = list(dict.fromkeys(locations))
-        values = [(loc,) for loc in unique_locations if loc.strip()]
+        with self._cursor() as cursor:
+            # Strip, drop blanks and remove duplicates in one pass, preserving order
+            unique_locations = dict.fromkeys(stripped for loc in locations if loc and (stripped := loc.strip()))
+            values = [(loc,) for loc in unique_locations]
 
-        if values:
-            cursor.executemany("""
-                INSERT INTO locations (name) VALUES (%s)
-                ON DUPLICATE KEY UPDATE name = VALUES(name);
-            """, values)
-            conn.commit()
-            print(f"📍 Batch upserted {len(values)} locations")
-        cursor.close()
+            if values:
+                cursor.executemany("""
+                    INSERT INTO locations (name) VALUES (%s)
+                    ON DUPLICATE KEY UPDATE name = VALUES(name);
+                """, values)
+                self._invalidate('locations')
+                log.info("📍 Batch upserted %d locations", len(values))
 
     def batch_upsert_items(self, items: list) -> None:
         """Batch insert or update items. Items should be tuples of (ticker, name, category)."""
         if not items:
             return
 
-        conn = self._connect()
-        cursor = conn.cursor()
-
-        # Remove duplicates by ticker while preserving latest data
-        items_dict = {}
-        for ticker, name, category in items:
-            if ticker and ticker.strip():
-                items_dict[ticker.strip()] = (ticker.strip(), name.strip(), category)
+        with self._cursor() as cursor:
+            # Remove duplicates by ticker while preserving latest data
+            items_dict = {
+                stripped: (stripped, name.strip(), category)
+                for ticker, name, category in items
+                if ticker and (stripped := ticker.strip())
+            }
 
-        values = list(items_dict.values())
+            # Skip items this handler has already written with the same name and category
+            values = [row for ticker, row in items_dict.items() if self._written_items.get(ticker) != row[1:]]
 
-        if values:
-            cursor.executemany("""
-                INSERT INTO items (ticker, name, category) VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE 
-                    name = VALUES(name),
-                    category = VALUES(category);
-            """, values)
-            conn.commit()
-            print(f"📦 Batch upserted {len(values)} items")
-        cursor.close()
+            if values:
+                cursor.executemany("""
+                    INSERT INTO items (ticker, name, category) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE 
+                        name = VALUES(name),
+                        category = VALUES(category);
+                """, values)
+                self._after_commit(self._written_items.update, {row[0]: row[1:] for row in values})
+                self._invalidate('items')
+                log.info("📦 Batch upserted %d items", len(values))
 
     def batch_upsert_prices(self, prices: list) -> None:
         """Batch insert or update prices. Prices should be tuples of (ticker, location, price, is_default, last_updated)."""
         if not prices:
             return
 
-        conn = self._connect()
-        cursor = conn.cursor()
+        with self._cursor() as cursor:
+            # Remove duplicates by ticker-location pair while preserving latest data
+            prices_dict = {
+                (ticker, location): (ticker, location, price, is_default, last_updated)
+                for ticker, location, price, is_default, last_updated in (
+                    (t.strip(), loc.strip(), p, d, u) for t, loc, p, d, u in prices if t and loc
+                )
+            }
 
-        # Remove duplicates by ticker-location pair while preserving latest data
-        prices_dict = {}
-        for ticker, location, price, is_default, last_updated in prices:
-            if ticker and location:
-                key = (ticker.strip(), location.strip())
-                prices_dict[key] = (ticker.strip(), location.strip(), price, is_default, last_updated)
+            values = list(prices_dict.values())
 
-        values = list(prices_dict.values())
-
-        if values:
-            cursor.executemany("""
-                INSERT INTO prices (ticker, location, price, is_default, last_updated) 
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE 
-                    price = VALUES(price),
-                    is_default = VALUES(is_default),
-                    last_updated = VALUES(last_updated);
-            """, values)
-            conn.commit()
-            print(f"💰 Batch upserted {len(values)} prices")
-        cursor.close()
+            if values:
+                cursor.executemany("""
+                    INSERT INTO prices (ticker, location, price, is_default, last_updated) 
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE 
+                        price = VALUES(price),
+                        is_default = VALUES(is_default),
+                        last_updated = VALUES(last_updated);
+                """, values)
+                self._invalidate('prices')
+                log.info("💰 Batch upserted %d prices", len(values))
 
     def batch_upsert_shipping(self, shipping_routes: list) -> None:
         """Batch insert or update shipping routes. Routes should be tuples of (from_location, to_location, cost)."""
         if not shipping_routes:
             return
 
-        conn = self._connect()
-        cursor = conn.cursor()
-
-        # Remove duplicates by route pair while preserving latest data
-        routes_dict = {}
-        for from_loc, to_loc, cost in shipping_routes:
-            if from_loc and to_loc:
-                key = (from_loc.strip(), to_loc.strip())
-                routes_dict[key] = (from_loc.strip(), to_loc.strip(), cost)
+        with self._cursor() as cursor:
+            # Remove duplicates by route pair while preserving latest data
+            routes_dict = {
+                (from_loc, to_loc): (from_loc, to_loc, cost)
+                for from_loc, to_loc, cost in (
+                    (f.strip(), t.strip(), c) for f, t, c in shipping_routes if f and t
+                )
+            }
 
-        values = list(routes_dict.values())
+            values = list(routes_dict.values())
 
-        if values:
-            cursor.executemany("""
-                INSERT INTO shipping (from_location, to_location, cost) 
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE cost = VALUES(cost);
-            """, values)
-            conn.commit()
-            print(f"🚛 Batch upserted {len(values)} shipping routes")
-        cursor.close()
+            if values:
+                cursor.executemany("""
+                    INSERT INTO shipping (from_location, to_location, cost) 
+                    VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE cost = VALUES(cost);
+                """, values)
+                self._invalidate('shipping')
+                log.info("🚛 Batch upserted %d shipping routes", len(values))
 
     # Legacy single-record methods (kept for backwards compatibility)
     def upsert_location(self, name: str) -> None:
@@ -502,158 +688,232 @@ class DatabaseHandler:
 
     def get_price(self, ticker: str, location: str = None) -> float | None:
         """Get price for a ticker at a specific location, or default price if location not specified."""
-        conn = self._connect()
-        cursor = conn.cursor()
+        def load():
+            with self._cursor() as cursor:
+                if location:
+                    # The location's own price sorts ahead of the default, so one query covers the fallback
+                    cursor.execute("""
+                        SELECT price FROM prices
+                        WHERE ticker = %s AND (location = %s OR is_default = TRUE)
+                        ORDER BY location = %s DESC
+                        LIMIT 1;
+                    """, (ticker, location, location))
+                else:
+                    # Get default price
+                    cursor.execute(
+                        "SELECT price FROM prices WHERE ticker = %s AND is_default = TRUE LIMIT 1;",
+                        (ticker,)
+                    )
+                row = cursor.fetchone()
+                return float(row[0]) if row else None
 
-        if location:
-            # Try to get specific location price first
-            cursor.execute(
-                "SELECT price FROM prices WHERE ticker = %s AND location = %s;",
-                (ticker, location)
-            )
-            row = cursor.fetchone()
-            if row:
-                cursor.close()
-                return float(row[0])
-
-            # Fall back to default price
-            cursor.execute(
-                "SELECT price FROM prices WHERE ticker = %s AND is_default = TRUE;",
-                (ticker,)
-            )
-            row = cursor.fetchone()
-            cursor.close()
-            return float(row[0]) if row else None
-        else:
-            # Get default price
-            cursor.execute(
-                "SELECT price FROM prices WHERE ticker = %s AND is_default = TRUE;",
-                (ticker,)
-            )
-            row = cursor.fetchone()
-            cursor.close()
-            return float(row[0]) if row else None
+        return self._cached('prices', (ticker, location), load)
 
     def get_shipping_cost(self, from_location: str, to_location: str) -> float | None:
         """Get shipping cost between two locations."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT cost FROM shipping WHERE from_location = %s AND to_location = %s;",
-            (from_location, to_location)
-        )
-        row = cursor.fetchone()
-        cursor.close()
-        return float(row[0]) if row else None
+        def load():
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "SELECT cost FROM shipping WHERE from_location = %s AND to_location = %s;",
+                    (from_location, to_location)
+                )
+                row = cursor.fetchone()
+                return float(row[0]) if row else None
+
+        return self._cached('shipping', (from_location, to_location), load)
 
     def get_all_items(self) -> list:
         """Get all items with their tickers and names."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT ticker, name, category FROM items ORDER BY ticker;")
-        items = cursor.fetchall()
-        cursor.close()
-        return items
+        def load():
+            with self._cursor() as cursor:
+                cursor.execute("SELECT ticker, name, category FROM items ORDER BY ticker;")
+                items = cursor.fetchall()
+                return items
+
+        return list(self._cached('items', None, load))
 
     def get_all_locations(self) -> list:
         """Get all location names."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM locations ORDER BY name;")
-        locations = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        return locations
+        def load():
+            with self._cursor() as cursor:
+                cursor.execute("SELECT name FROM locations ORDER BY name;")
+                locations = [row[0] for row in cursor.fetchall()]
+                return locations
+
+        return list(self._cached('locations', None, load))
 
     # === Inventory Management Methods ===
 
     def upsert_player(self, username: str) -> None:
         """Insert or update a player record."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO players (username) VALUES (%s)
-            ON DUPLICATE KEY UPDATE username = VALUES(username);
-        """, (username,))
-        conn.commit()
-        cursor.close()
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO players (username) VALUES (%s)
+                ON DUPLICATE KEY UPDATE username = VALUES(username);
+            """, (username,))
+
+    def batch_upsert_players(self, usernames: list) -> None:
+        """Batch insert or update player records."""
+        values = [(username,) for username in dict.fromkeys(usernames) if username]
+        if not values:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO players (username) VALUES (%s)
+                ON DUPLICATE KEY UPDATE username = VALUES(username);
+            """, values)
+
+    def batch_upsert_planets(self, planets: list) -> None:
+        """Batch insert or update planets. Planets should be tuples of (planet_id, identifier, name, founded_epoch_ms)."""
+        if not planets:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO planets (id, identifier, name, founded_epoch_ms) 
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    identifier = VALUES(identifier),
+                    name = VALUES(name),
+                    founded_epoch_ms = VALUES(founded_epoch_ms);
+            """, planets)
+
+    def batch_upsert_sites(self, sites: list) -> None:
+        """
+        Batch insert or update sites. Sites should be tuples of
+        (site_id, planet_id, username, invested_permits, maximum_permits).
+        """
+        if not sites:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO sites (id, planet_id, username, invested_permits, maximum_permits) 
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    planet_id = VALUES(planet_id),
+                    invested_permits = VALUES(invested_permits),
+                    maximum_permits = VALUES(maximum_permits);
+            """, sites)
+
+    def batch_upsert_ships(self, ships: list) -> None:
+        """Batch insert or update ships. Ships should be tuples of (addressable_id, name, username)."""
+        if not ships:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO ships (addressable_id, name, username) 
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    name = VALUES(name);
+            """, ships)
 
     def upsert_planet(self, planet_id: str, identifier: str, name: str, founded_epoch_ms: int = None) -> None:
         """Insert or update planet information."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO planets (id, identifier, name, founded_epoch_ms) 
-            VALUES (%s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-                identifier = VALUES(identifier),
-                name = VALUES(name),
-                founded_epoch_ms = VALUES(founded_epoch_ms);
-        """, (planet_id, identifier, name, founded_epoch_ms))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_planets([(planet_id, identifier, name, founded_epoch_ms)])
 
     def upsert_site(self, site_id: str, planet_id: str, username: str, invested_permits: int = 0,
                     maximum_permits: int = 3) -> None:
         """Insert or update site information."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO sites (id, planet_id, username, invested_permits, maximum_permits) 
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-                planet_id = VALUES(planet_id),
-                invested_permits = VALUES(invested_permits),
-                maximum_permits = VALUES(maximum_permits);
-        """, (site_id, planet_id, username, invested_permits, maximum_permits))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_sites([(site_id, planet_id, username, invested_permits, maximum_permits)])
 
     def upsert_ship(self, addressable_id: str, name: str, username: str) -> None:
         """Insert or update ship information."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO ships (addressable_id, name, username) 
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-                name = VALUES(name);
-        """, (addressable_id, name, username))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_ships([(addressable_id, name, username)])
+
+    def batch_upsert_storage_containers(self, containers: list) -> None:
+        """
+        Batch insert or update storage containers. Containers should be tuples of
+        (storage_id, addressable_id, username, container_name, storage_type,
+         weight_capacity, weight_load, volume_capacity, volume_load, fixed_store).
+        """
+        if not containers:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO storage_containers 
+                (storage_id, addressable_id, username, container_name, storage_type, 
+                 weight_capacity, weight_load, volume_capacity, volume_load, fixed_store) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    addressable_id = VALUES(addressable_id),
+                    container_name = VALUES(container_name),
+                    storage_type = VALUES(storage_type),
+                    weight_capacity = VALUES(weight_capacity),
+                    weight_load = VALUES(weight_load),
+                    volume_capacity = VALUES(volume_capacity),
+                    volume_load = VALUES(volume_load),
+                    fixed_store = VALUES(fixed_store);
+            """, containers)
+
+    def batch_clear_inventory_items(self, storage_ids: list) -> None:
+        """Clear all inventory items for the given storage containers."""
+        self._delete_where_in('inventory_items', 'storage_id', storage_ids)
+
+    def batch_upsert_inventory_items(self, inventory_items: list) -> None:
+        """
+        Batch insert or update inventory items. Items should be tuples of
+        (storage_id, material_id, material_ticker, material_name, material_category, amount,
+         material_weight, material_volume, total_weight, total_volume, material_value, material_value_currency).
+        """
+        if not inventory_items:
+            return
 
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO inventory_items 
+                (storage_id, material_id, material_ticker, material_name, material_category, amount, 
+                 material_weight, material_volume, total_weight, total_volume, material_value, material_value_currency) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    material_ticker = VALUES(material_ticker),
+                    material_name = VALUES(material_name),
+                    material_category = VALUES(material_category),
+                    amount = VALUES(amount),
+                    material_weight = VALUES(material_weight),
+                    material_volume = VALUES(material_volume),
+                    total_weight = VALUES(total_weight),
+                    total_volume = VALUES(total_volume),
+                    material_value = VALUES(material_value),
+                    material_value_currency = VALUES(material_value_currency);
+            """, inventory_items)
+
+    def batch_prune_inventory_items(self, storage_ids: list, inventory_items: list) -> None:
+        """
+        Delete the inventory items of the given storage containers that are not in inventory_items,
+        which holds the rows just upserted for them (storage_id and material_id come first).
+        """
+        if not storage_ids:
+            return
+
+        with self._cursor() as cursor:
+            query = f"DELETE FROM inventory_items WHERE storage_id IN ({', '.join(['%s'] * len(storage_ids))})"
+            params = list(storage_ids)
+
+            # Rows still present keep their id; only materials that left a container are removed
+            if inventory_items:
+                query += f" AND (storage_id, material_id) NOT IN ({', '.join(['(%s, %s)'] * len(inventory_items))})"
+                for row in inventory_items:
+                    params.extend(row[:2])
+
+            cursor.execute(query + ";", tuple(params))
+
+    # Single-record wrappers around the batch methods above
     def upsert_storage_container(self, storage_id: str, addressable_id: str, username: str,
                                  container_name: str, storage_type: str, weight_capacity: float,
                                  weight_load: float, volume_capacity: float, volume_load: float,
                                  fixed_store: bool) -> None:
         """Insert or update storage container information."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO storage_containers 
-            (storage_id, addressable_id, username, container_name, storage_type, 
-             weight_capacity, weight_load, volume_capacity, volume_load, fixed_store) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-                addressable_id = VALUES(addressable_id),
-                container_name = VALUES(container_name),
-                storage_type = VALUES(storage_type),
-                weight_capacity = VALUES(weight_capacity),
-                weight_load = VALUES(weight_load),
-                volume_capacity = VALUES(volume_capacity),
-                volume_load = VALUES(volume_load),
-                fixed_store = VALUES(fixed_store);
-        """, (storage_id, addressable_id, username, container_name, storage_type,
-              weight_capacity, weight_load, volume_capacity, volume_load, fixed_store))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_storage_containers([(storage_id, addressable_id, username, container_name, storage_type,
+                                               weight_capacity, weight_load, volume_capacity, volume_load,
+                                               fixed_store)])
 
     def clear_inventory_items(self, storage_id: str) -> None:
         """Clear all inventory items for a specific storage container."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM inventory_items WHERE storage_id = %s;", (storage_id,))
-        conn.commit()
-        cursor.close()
+        self.batch_clear_inventory_items([storage_id])
 
     def upsert_inventory_item(self, storage_id: str, material_id: str, material_ticker: str,
                               material_name: str, material_category: str, amount: int,
@@ -661,238 +921,363 @@ class DatabaseHandler:
                               total_volume: float, material_value: float,
                               material_value_currency: str = 'CIS') -> None:
         """Insert or update an inventory item."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO inventory_items 
-            (storage_id, material_id, material_ticker, material_name, material_category, amount, 
-             material_weight, material_volume, total_weight, total_volume, material_value, material_value_currency) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-                material_ticker = VALUES(material_ticker),
-                material_name = VALUES(material_name),
-                material_category = VALUES(material_category),
-                amount = VALUES(amount),
-                material_weight = VALUES(material_weight),
-                material_volume = VALUES(material_volume),
-                total_weight = VALUES(total_weight),
-                total_volume = VALUES(total_volume),
-                material_value = VALUES(material_value),
-                material_value_currency = VALUES(material_value_currency);
-        """, (storage_id, material_id, material_ticker, material_name, material_category, amount,
-              material_weight, material_volume, total_weight, total_volume, material_value,
-              material_value_currency))
-        conn.commit()
-        cursor.close()
-
-    def sync_user_inventory_data(self, fio_handler, username: str) -> bool:
+        self.batch_upsert_inventory_items([(storage_id, material_id, material_ticker, material_name,
+                                            material_category, amount, material_weight, material_volume,
+                                            total_weight, total_volume, material_value, material_value_currency)])
+
+    def sync_user_inventory_data(self, fio_handler, username: str) -> dict | bool:
         """
         Sync all inventory data for a specific user using FIO API.
         This is the main method that orchestrates the entire inventory sync.
+        Returns the user's inventory totals, or False if the sync failed.
         """
-        try:
-            print(f"Syncing inventory data for user: {username}")
+        return self.store_user_inventory_data(username, self.fetch_user_inventory_data(fio_handler, username))
 
-            # Step 1: Ensure player exists
-            self.upsert_player(username)
-
-            # Step 2: Get storage data
-            storage_data, storage_status = fio_handler.storage(username)
-            if storage_status != 200 or not storage_data:
-                print(f"Failed to get storage data for {username} (Status: {storage_status})")
-                return False
+    def fetch_user_inventory_data(self, fio_handler, username: str) -> dict | None:
+        """
+        Fetch a user's storage and site data from the FIO API without touching the database,
+        so it can run on a worker thread. Returns None if the storage data is unavailable.
+        """
+        # Get storage data
+        storage_data, storage_status = fio_handler.storage(username)
+        if storage_status != 200 or not storage_data:
+            log.warning("Failed to get storage data for %s (Status: %s)", username, storage_status)
+            return None
+
+        # Get planets and sites data for location resolution
+        sites_by_planet = {}  # planet_id -> list of sites
+        planets_data, planets_status = fio_handler.sites_planets(username)
+
+        if planets_status == 200 and planets_data:
+            # Fetched in turn: callers already run one user per worker, so the
+            # concurrency comes from their pool rather than a nested one
+            for planet_id in planets_data:
+                sites_data, sites_status = fio_handler.sites(username, planet_id)
+                if sites_status == 200 and sites_data:
+                    # Handle both single site and multiple sites
+                    sites_by_planet[planet_id] = sites_data if isinstance(sites_data, list) else [sites_data]
+
+        return {'storage': storage_data, 'sites': sites_by_planet}
+
+    def store_user_inventory_data(self, username: str, fetched: dict | None) -> dict | bool:
+        """
+        Write inventory data returned by fetch_user_inventory_data to the database.
+        Returns the user's inventory totals, or False if the sync failed.
+        """
+        try:
+            # A failure part-way rolls back everything this call wrote
+            with self.transaction():
+                log.info("Syncing inventory data for user: %s", username)
+
+                # Step 1: Ensure player exists
+                self.upsert_player(username)
+
+                # Step 2: Bail out if the storage data could not be fetched
+                if fetched is None:
+                    return False
+                storage_data = fetched['storage']
+
+                # Step 3: Store planets and sites for location resolution, one row per id
+                location_map = {}  # addressable_id -> planet_name
+                planet_rows = {}  # planet_id -> row
+                site_rows = {}  # site_id -> row
+
+                for planet_id, sites in fetched['sites'].items():
+                    for site in sites:
+                        # Planet info
+                        planet_rows[planet_id] = (
+                            planet_id,
+                            site.get('PlanetIdentifier'),
+                            site.get('PlanetName'),
+                            site.get('PlanetFoundedEpochMs')
+                        )
 
-            # Step 3: Get planets and sites data for location resolution
-            planets_data, planets_status = fio_handler.sites_planets(username)
-            location_map = {}  # addressable_id -> planet_name
-
-            if planets_status == 200 and planets_data:
-                for planet_id in planets_data:
-                    sites_data, sites_status = fio_handler.sites(username, planet_id)
-                    if sites_status == 200 and sites_data:
-                        # Handle both single site and multiple sites
-                        sites = sites_data if isinstance(sites_data, list) else [sites_data]
-
-                        for site in sites:
-                            # Store planet info
-                            self.upsert_planet(
-                                planet_id,
-                                site.get('PlanetIdentifier'),
-                                site.get('PlanetName'),
-                                site.get('PlanetFoundedEpochMs')
+                        # Site info
+                        site_id = site.get('SiteId')
+                        if site_id:
+                            site_rows[site_id] = (
+                                site_id, planet_id, username,
+                                site.get('InvestedPermits', 0),
+                                site.get('MaximumPermits', 3)
                             )
+                            location_map[site_id] = site.get('PlanetName')
+
+                self.batch_upsert_planets(list(planet_rows.values()))
+                self.batch_upsert_sites(list(site_rows.values()))
+
+                # Step 4: Process storage data, collecting rows so each table is written in one batch
+                ship_rows = {}  # addressable_id -> row, first name seen wins
+                container_rows = []
+                item_rows = []
+                inventory_rows = []
+
+                for storage in storage_data:
+                    addressable_id = storage.get('AddressableId')
+                    storage_id = storage.get('StorageId')
+                    storage_type = storage.get('Type')
+                    container_name = storage.get('Name')
+
+                    # Handle ships (they have names and move around)
+                    if storage_type in ['SHIP_STORE', 'FTL_FUEL_STORE',
+                                        'STL_FUEL_STORE'] and container_name and container_name != 'None':
+                        ship_rows.setdefault(addressable_id, (addressable_id, container_name, username))
+
+                    # Storage container info
+                    container_rows.append((
+                        storage_id, addressable_id, username, container_name, storage_type,
+                        storage.get('WeightCapacity', 0), storage.get('WeightLoad', 0),
+                        storage.get('VolumeCapacity', 0), storage.get('VolumeLoad', 0),
+                        storage.get('FixedStore', False)
+                    ))
+
+                    # Inventory items, plus the items table entries they reference
+                    for item in storage.get('StorageItems', []):
+                        item_rows.append((
+                            item.get('MaterialTicker'),
+                            item.get('MaterialName'),
+                            item.get('MaterialCategory')
+                        ))
+                        inventory_rows.append((
+                            storage_id, item.get('MaterialId'), item.get('MaterialTicker'),
+                            item.get('MaterialName'), item.get('MaterialCategory'),
+                            item.get('MaterialAmount', 0), item.get('MaterialWeight', 0),
+                            item.get('MaterialVolume', 0), item.get('TotalWeight', 0),
+                            item.get('TotalVolume', 0), item.get('MaterialValue', 0),
+                            item.get('MaterialValueCurrency', 'CIS')
+                        ))
+
+                # Ships and containers first, then update the containers' contents in place
+                # and drop only the materials that are no longer in them
+                self.batch_upsert_ships(list(ship_rows.values()))
+                self.batch_upsert_storage_containers(container_rows)
+                self.batch_upsert_items(item_rows)
+                self.batch_upsert_inventory_items(inventory_rows)
+                self.batch_prune_inventory_items([row[0] for row in container_rows], inventory_rows)
+
+                log.info("Successfully synced inventory data for %s", username)
+
+                # Totals come from the data just written, so callers need no summary query
+                return {
+                    'containers': len(storage_data),
+                    'total_weight_used': sum(float(storage.get('WeightLoad') or 0) for storage in storage_data),
+                    'total_weight_capacity': sum(float(storage.get('WeightCapacity') or 0) for storage in storage_data),
+                    'total_volume_used': sum(float(storage.get('VolumeLoad') or 0) for storage in storage_data),
+                    'total_volume_capacity': sum(float(storage.get('VolumeCapacity') or 0) for storage in storage_data)
+                }
 
-                            # Store site info
-                            site_id = site.get('SiteId')
-                            if site_id:
-                                self.upsert_site(
-                                    site_id, planet_id, username,
-                                    site.get('InvestedPermits', 0),
-                                    site.get('MaximumPermits', 3)
-                                )
-                                location_map[site_id] = site.get('PlanetName')
-
-            # Step 4: Process storage data
-            ships_found = set()  # Track ships we've seen
-
-            for storage in storage_data:
-                addressable_id = storage.get('AddressableId')
-                storage_id = storage.get('StorageId')
-                storage_type = storage.get('Type')
-                container_name = storage.get('Name')
-
-                # Handle ships (they have names and move around)
-                if storage_type in ['SHIP_STORE', 'FTL_FUEL_STORE',
-                                    'STL_FUEL_STORE'] and container_name and container_name != 'None':
-                    if addressable_id not in ships_found:
-                        self.upsert_ship(addressable_id, container_name, username)
-                        ships_found.add(addressable_id)
-
-                # Store storage container info
-                self.upsert_storage_container(
-                    storage_id, addressable_id, username, container_name, storage_type,
-                    storage.get('WeightCapacity', 0), storage.get('WeightLoad', 0),
-                    storage.get('VolumeCapacity', 0), storage.get('VolumeLoad', 0),
-                    storage.get('FixedStore', False)
-                )
-
-                # Clear existing inventory items for this container
-                self.clear_inventory_items(storage_id)
-
-                # Add inventory items
-                storage_items = storage.get('StorageItems', [])
-                for item in storage_items:
-                    # Also ensure the item exists in the items table
-                    self.upsert_item(
-                        item.get('MaterialTicker'),
-                        item.get('MaterialName'),
-                        item.get('MaterialCategory')
-                    )
+        except Exception as e:
+            log.exception("Error syncing inventory data for %s: %s", username, e)
+            return False
 
-                    # Add to inventory
-                    self.upsert_inventory_item(
-                        storage_id, item.get('MaterialId'), item.get('MaterialTicker'),
-                        item.get('MaterialName'), item.get('MaterialCategory'),
-                        item.get('MaterialAmount', 0), item.get('MaterialWeight', 0),
-                        item.get('MaterialVolume', 0), item.get('TotalWeight', 0),
-                        item.get('TotalVolume', 0), item.get('MaterialValue', 0),
-                        item.get('MaterialValueCurrency', 'CIS')
-                    )
+    def fetch_user_all_data(self, fio_handler, username: str) -> dict:
+        """Fetch a user's inventory and production data from the FIO API without touching the database."""
+        # Fetched in turn; callers overlap users through their own pool, under FIOHandler's request limit
+        return {
+            'inventory': self.fetch_user_inventory_data(fio_handler, username),
+            'production': self.fetch_user_production_data(fio_handler, username)
+        }
 
-            print(f"Successfully synced inventory data for {username}")
-            return True
+    def store_user_all_data(self, username: str, fetched: dict) -> tuple:
+        """
+        Write data returned by fetch_user_all_data in one transaction.
+        Returns: (inventory_totals, production_totals), each False if that part failed
+        """
+        with self.transaction():
+            inventory_totals = self.store_user_inventory_data(username, fetched['inventory'])
+            production_totals = self.store_user_production_data(username, fetched['production'])
+        return inventory_totals, production_totals
 
-        except Exception as e:
-            print(f"Error syncing inventory data for {username}: {e}")
-            return False
+    def sync_user_all_data(self, fio_handler, username: str) -> tuple:
+        """
+        Sync inventory and production data for a specific user in a single pass.
+        Returns: (inventory_totals, production_totals), each False if that part failed
+        """
+        return self.store_user_all_data(username, self.fetch_user_all_data(fio_handler, username))
 
     def get_user_inventory_summary(self, username: str) -> dict:
-            """Get a summary of a user's inventory across all locations."""
-            conn = self._connect()
-            cursor = conn.cursor()
-
-            # Get storage containers with location info
+        """Get a summary of a user's inventory across all locations."""
+        # Read-only, so a sync writing the same tables neither blocks nor is blocked by it
+        with self.transaction(read_only=True), self._cursor() as cursor:
+            # Get storage containers with location info and their item counts in one pass
             cursor.execute("""
                 SELECT 
                     sc.storage_id, sc.container_name, sc.storage_type,
                     sc.weight_load, sc.weight_capacity, sc.volume_load, sc.volume_capacity,
-                    p.name as planet_name, s.name as ship_name
+                    p.name as planet_name, s.name as ship_name,
+                    COUNT(ii.id) as item_count, SUM(ii.amount) as total_items
                 FROM storage_containers sc
                 LEFT JOIN sites site ON sc.addressable_id = site.id
                 LEFT JOIN planets p ON site.planet_id = p.id
                 LEFT JOIN ships s ON sc.addressable_id = s.addressable_id
+                LEFT JOIN inventory_items ii ON sc.storage_id = ii.storage_id
                 WHERE sc.username = %s
+                GROUP BY sc.storage_id, sc.container_name, sc.storage_type,
+                         sc.weight_load, sc.weight_capacity, sc.volume_load, sc.volume_capacity,
+                         p.name, s.name
                 ORDER BY sc.storage_type, sc.container_name;
             """, (username,))
 
             containers = cursor.fetchall()
 
-            # Get inventory items count by container
-            cursor.execute("""
-                SELECT sc.storage_id, COUNT(ii.id) as item_count, SUM(ii.amount) as total_items
-                FROM storage_containers sc
-                LEFT JOIN inventory_items ii ON sc.storage_id = ii.storage_id
-                WHERE sc.username = %s
-                GROUP BY sc.storage_id;
-            """, (username,))
+        summary = {
+            'username': username,
+            'containers': [],
+            'totals': {'containers': len(containers)}
+        }
 
-            item_counts = {row[0]: {'unique_items': row[1], 'total_quantity': row[2]} for row in cursor.fetchall()}
-            cursor.close()
-
-            summary = {
-                'username': username,
-                'containers': [],
-                'totals': {
-                    'containers': len(containers),
-                    'total_weight_used': 0,
-                    'total_weight_capacity': 0,
-                    'total_volume_used': 0,
-                    'total_volume_capacity': 0
-                }
-            }
+        # Accumulate the totals in locals and write them to the summary once
+        weight_used = weight_capacity_total = volume_used = volume_capacity_total = 0.0
+
+        for container in containers:
+            (storage_id, container_name, storage_type, weight_load, weight_capacity, volume_load, volume_capacity,
+             planet_name, ship_name, item_count, total_items) = container
+
+            # DECIMAL columns arrive as Decimal; convert each once (CAST AS DOUBLE needs MySQL 8.0.17+)
+            weight_load, weight_capacity = float(weight_load), float(weight_capacity)
+            volume_load, volume_capacity = float(volume_load), float(volume_capacity)
+            location = planet_name or ship_name or "Unknown"
+
+            summary['containers'].append({
+                'storage_id': storage_id,
+                'name': container_name,
+                'type': storage_type,
+                'location': location,
+                'weight_used': weight_load,
+                'weight_capacity': weight_capacity,
+                'volume_used': volume_load,
+                'volume_capacity': volume_capacity,
+                'unique_items': item_count,
+                'total_quantity': total_items or 0
+            })
 
-            for container in containers:
-                storage_id, container_name, storage_type, weight_load, weight_capacity, volume_load, volume_capacity, planet_name, ship_name = container
-
-                location = planet_name or ship_name or "Unknown"
-                counts = item_counts.get(storage_id, {'unique_items': 0, 'total_quantity': 0})
-
-                summary['containers'].append({
-                    'storage_id': storage_id,
-                    'name': container_name,
-                    'type': storage_type,
-                    'location': location,
-                    'weight_used': float(weight_load),
-                    'weight_capacity': float(weight_capacity),
-                    'volume_used': float(volume_load),
-                    'volume_capacity': float(volume_capacity),
-                    'unique_items': counts['unique_items'],
-                    'total_quantity': counts['total_quantity'] or 0
-                })
+            weight_used += weight_load
+            weight_capacity_total += weight_capacity
+            volume_used += volume_load
+            volume_capacity_total += volume_capacity
+
+        summary['totals'].update({
+            'total_weight_used': weight_used,
+            'total_weight_capacity': weight_capacity_total,
+            'total_volume_used': volume_used,
+            'total_volume_capacity': volume_capacity_total
+        })
+
+        return summary
+
+    # === Production Management Methods ===
+
+    def batch_upsert_production_facilities(self, facilities: list) -> None:
+        """
+        Batch insert or update production facilities. Facilities should be tuples of
+        (production_line_id, site_id, planet_id, planet_natural_id, planet_name, username,
+         facility_type, capacity, efficiency, condition).
+        """
+        if not facilities:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                    INSERT INTO production_facilities 
+                    (production_line_id, site_id, planet_id, planet_natural_id, planet_name, username, 
+                     facility_type, capacity, efficiency, facility_condition) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE 
+                        site_id = VALUES(site_id),
+                        planet_id = VALUES(planet_id),
+                        planet_natural_id = VALUES(planet_natural_id),
+                        planet_name = VALUES(planet_name),
+                        facility_type = VALUES(facility_type),
+                        capacity = VALUES(capacity),
+                        efficiency = VALUES(efficiency),
+                        facility_condition = VALUES(facility_condition);
+                """, facilities)
+
+    def batch_clear_production_orders(self, production_line_ids: list) -> None:
+        """Clear all production orders for the given production lines."""
+        self._delete_where_in('production_orders', 'production_line_id', production_line_ids)
+
+    def batch_upsert_production_orders(self, orders: list) -> None:
+        """
+        Batch insert or update production orders. Orders should be tuples of
+        (order_id, production_line_id, username, created_epoch_ms, started_epoch_ms,
+         completion_epoch_ms, duration_ms, last_updated_epoch_ms, completed_percentage,
+         is_halted, recurring, standard_recipe_name, production_fee, production_fee_currency).
+        """
+        if not orders:
+            return
 
-                # Add to totals
-                summary['totals']['total_weight_used'] += float(weight_load)
-                summary['totals']['total_weight_capacity'] += float(weight_capacity)
-                summary['totals']['total_volume_used'] += float(volume_load)
-                summary['totals']['total_volume_capacity'] += float(volume_capacity)
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                    INSERT INTO production_orders 
+                    (order_id, production_line_id, username, created_epoch_ms, started_epoch_ms, 
+                     completion_epoch_ms, duration_ms, last_updated_epoch_ms, completed_percentage, 
+                     is_halted, recurring, standard_recipe_name, production_fee, production_fee_currency) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE 
+                        created_epoch_ms = VALUES(created_epoch_ms),
+                        started_epoch_ms = VALUES(started_epoch_ms),
+                        completion_epoch_ms = VALUES(completion_epoch_ms),
+                        duration_ms = VALUES(duration_ms),
+                        last_updated_epoch_ms = VALUES(last_updated_epoch_ms),
+                        completed_percentage = VALUES(completed_percentage),
+                        is_halted = VALUES(is_halted),
+                        recurring = VALUES(recurring),
+                        standard_recipe_name = VALUES(standard_recipe_name),
+                        production_fee = VALUES(production_fee),
+                        production_fee_currency = VALUES(production_fee_currency);
+                """, orders)
+
+    def batch_clear_production_order_inputs(self, order_ids: list) -> None:
+        """Clear all input materials for the given production orders."""
+        self._delete_where_in('production_order_inputs', 'order_id', order_ids)
+
+    def batch_clear_production_order_outputs(self, order_ids: list) -> None:
+        """Clear all output materials for the given production orders."""
+        self._delete_where_in('production_order_outputs', 'order_id', order_ids)
+
+    def batch_upsert_production_order_inputs(self, materials: list) -> None:
+        """
+        Batch insert production order input materials. Materials should be tuples of
+        (order_id, material_id, material_ticker, material_name, amount).
+        """
+        if not materials:
+            return
 
-            return summary
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                    INSERT INTO production_order_inputs 
+                    (order_id, material_id, material_ticker, material_name, amount) 
+                    VALUES (%s, %s, %s, %s, %s);
+                """, materials)
 
-            # === Production Management Methods ===
+    def batch_upsert_production_order_outputs(self, materials: list) -> None:
+        """
+        Batch insert production order output materials. Materials should be tuples of
+        (order_id, material_id, material_ticker, material_name, amount).
+        """
+        if not materials:
+            return
 
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                    INSERT INTO production_order_outputs 
+                    (order_id, material_id, material_ticker, material_name, amount) 
+                    VALUES (%s, %s, %s, %s, %s);
+                """, materials)
+
+    # Single-record wrappers around the batch methods above
     def upsert_production_facility(self, production_line_id: str, site_id: str, planet_id: str,
                                    planet_natural_id: str, planet_name: str, username: str,
                                    facility_type: str, capacity: int, efficiency: float,
                                    condition: float) -> None:
         """Insert or update a production facility."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-                INSERT INTO production_facilities 
-                (production_line_id, site_id, planet_id, planet_natural_id, planet_name, username, 
-                 facility_type, capacity, efficiency, facility_condition) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE 
-                    site_id = VALUES(site_id),
-                    planet_id = VALUES(planet_id),
-                    planet_natural_id = VALUES(planet_natural_id),
-                    planet_name = VALUES(planet_name),
-                    facility_type = VALUES(facility_type),
-                    capacity = VALUES(capacity),
-                    efficiency = VALUES(efficiency),
-                    facility_condition = VALUES(facility_condition);
-            """, (production_line_id, site_id, planet_id, planet_natural_id, planet_name, username,
-                  facility_type, capacity, efficiency, condition))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_production_facilities([(production_line_id, site_id, planet_id, planet_natural_id,
+                                                  planet_name, username, facility_type, capacity, efficiency,
+                                                  condition)])
 
     def clear_production_orders(self, production_line_id: str) -> None:
         """Clear all production orders for a specific production line."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM production_orders WHERE production_line_id = %s;", (production_line_id,))
-        conn.commit()
-        cursor.close()
+        self.batch_clear_production_orders([production_line_id])
 
     def upsert_production_order(self, order_id: str, production_line_id: str, username: str,
                                 created_epoch_ms: int = None, started_epoch_ms: int = None,
@@ -902,301 +1287,259 @@ class DatabaseHandler:
                                 standard_recipe_name: str = None, production_fee: float = 0,
                                 production_fee_currency: str = 'NCC') -> None:
         """Insert or update a production order."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-                INSERT INTO production_orders 
-                (order_id, production_line_id, username, created_epoch_ms, started_epoch_ms, 
-                 completion_epoch_ms, duration_ms, last_updated_epoch_ms, completed_percentage, 
-                 is_halted, recurring, standard_recipe_name, production_fee, production_fee_currency) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE 
-                    created_epoch_ms = VALUES(created_epoch_ms),
-                    started_epoch_ms = VALUES(started_epoch_ms),
-                    completion_epoch_ms = VALUES(completion_epoch_ms),
-                    duration_ms = VALUES(duration_ms),
-                    last_updated_epoch_ms = VALUES(last_updated_epoch_ms),
-                    completed_percentage = VALUES(completed_percentage),
-                    is_halted = VALUES(is_halted),
-                    recurring = VALUES(recurring),
-                    standard_recipe_name = VALUES(standard_recipe_name),
-                    production_fee = VALUES(production_fee),
-                    production_fee_currency = VALUES(production_fee_currency);
-            """, (order_id, production_line_id, username, created_epoch_ms, started_epoch_ms,
-                  completion_epoch_ms, duration_ms, last_updated_epoch_ms, completed_percentage,
-                  is_halted, recurring, standard_recipe_name, production_fee, production_fee_currency))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_production_orders([(order_id, production_line_id, username, created_epoch_ms,
+                                              started_epoch_ms, completion_epoch_ms, duration_ms,
+                                              last_updated_epoch_ms, completed_percentage, is_halted, recurring,
+                                              standard_recipe_name, production_fee, production_fee_currency)])
 
     def clear_production_order_inputs(self, order_id: str) -> None:
         """Clear all input materials for a production order."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM production_order_inputs WHERE order_id = %s;", (order_id,))
-        conn.commit()
-        cursor.close()
+        self.batch_clear_production_order_inputs([order_id])
 
     def clear_production_order_outputs(self, order_id: str) -> None:
         """Clear all output materials for a production order."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM production_order_outputs WHERE order_id = %s;", (order_id,))
-        conn.commit()
-        cursor.close()
+        self.batch_clear_production_order_outputs([order_id])
 
     def upsert_production_order_input(self, order_id: str, material_id: str, material_ticker: str,
                                       material_name: str, amount: int) -> None:
         """Insert production order input material."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-                INSERT INTO production_order_inputs 
-                (order_id, material_id, material_ticker, material_name, amount) 
-                VALUES (%s, %s, %s, %s, %s);
-            """, (order_id, material_id, material_ticker, material_name, amount))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_production_order_inputs([(order_id, material_id, material_ticker, material_name, amount)])
 
     def upsert_production_order_output(self, order_id: str, material_id: str, material_ticker: str,
                                        material_name: str, amount: int) -> None:
         """Insert production order output material."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-                INSERT INTO production_order_outputs 
-                (order_id, material_id, material_ticker, material_name, amount) 
-                VALUES (%s, %s, %s, %s, %s);
-            """, (order_id, material_id, material_ticker, material_name, amount))
-        conn.commit()
-        cursor.close()
-
-    def sync_user_production_data(self, fio_handler, username: str) -> bool:
+        self.batch_upsert_production_order_outputs([(order_id, material_id, material_ticker, material_name, amount)])
+
+    def sync_user_production_data(self, fio_handler, username: str) -> dict | bool:
         """
         Sync all production data for a specific user using FIO API.
+        Returns the user's production totals, or False if the sync failed.
         """
-        try:
-            print(f"Syncing production data for user: {username}")
+        return self.store_user_production_data(username, self.fetch_user_production_data(fio_handler, username))
 
-            # Ensure player exists
-            self.upsert_player(username)
-
-            # Get production data
-            production_data, production_status = fio_handler.production(username)
-            if production_status != 200 or not production_data:
-                print(f"Failed to get production data for {username} (Status: {production_status})")
-                return False
-
-            # Process each production facility
-            for facility in production_data:
-                production_line_id = facility.get('ProductionLineId')
-                site_id = facility.get('SiteId')
-                planet_id = facility.get('PlanetId')
-                planet_natural_id = facility.get('PlanetNaturalId')
-                planet_name = facility.get('PlanetName')
-                facility_type = facility.get('Type')
-                capacity = facility.get('Capacity', 0)
-                efficiency = facility.get('Efficiency', 0)
-                condition = facility.get('Condition', 0)
-
-                # Store facility info
-                self.upsert_production_facility(
-                    production_line_id, site_id, planet_id, planet_natural_id,
-                    planet_name, username, facility_type, capacity, efficiency, condition
-                )
-
-                # Clear existing orders for this facility
-                self.clear_production_orders(production_line_id)
-
-                # Process orders
-                orders = facility.get('Orders', [])
-                for order in orders:
-                    order_id = order.get('ProductionLineOrderId')
-
-                    # Store order info
-                    self.upsert_production_order(
-                        order_id, production_line_id, username,
-                        order.get('CreatedEpochMs'),
-                        order.get('StartedEpochMs'),
-                        order.get('CompletionEpochMs'),
-                        order.get('DurationMs'),
-                        order.get('LastUpdatedEpochMs'),
-                        order.get('CompletedPercentage', 0),
-                        order.get('IsHalted', False),
-                        order.get('Recurring', False),
-                        order.get('StandardRecipeName'),
-                        order.get('ProductionFee', 0),
-                        order.get('ProductionFeeCurrency', 'NCC')
-                    )
-
-                    # Clear and add input materials
-                    self.clear_production_order_inputs(order_id)
-                    inputs = order.get('Inputs', [])
-                    for input_material in inputs:
-                        # Ensure material exists in items table
-                        self.upsert_item(
-                            input_material.get('MaterialTicker'),
-                            input_material.get('MaterialName'),
-                            input_material.get('MaterialCategory')
-                        )
-
-                        self.upsert_production_order_input(
-                            order_id,
-                            input_material.get('MaterialId'),
-                            input_material.get('MaterialTicker'),
-                            input_material.get('MaterialName'),
-                            input_material.get('MaterialAmount', 0)
-                        )
-
-                    # Clear and add output materials
-                    self.clear_production_order_outputs(order_id)
-                    outputs = order.get('Outputs', [])
-                    for output_material in outputs:
-                        # Ensure material exists in items table
-                        self.upsert_item(
-                            output_material.get('MaterialTicker'),
-                            output_material.get('MaterialName'),
-                            output_material.get('MaterialCategory')
-                        )
-
-                        self.upsert_production_order_output(
-                            order_id,
-                            output_material.get('MaterialId'),
-                            output_material.get('MaterialTicker'),
-                            output_material.get('MaterialName'),
-                            output_material.get('MaterialAmount', 0)
-                        )
+    def fetch_user_production_data(self, fio_handler, username: str) -> list | None:
+        """
+        Fetch a user's production lines from the FIO API without touching the database,
+        so it can run on a worker thread. Returns None if the data is unavailable.
+        """
+        production_data, production_status = fio_handler.production(username)
+        if production_status != 200 or not production_data:
+            log.warning("Failed to get production data for %s (Status: %s)", username, production_status)
+            return None
+        return production_data
 
-            print(f"Successfully synced production data for {username}")
-            return True
+    def store_user_production_data(self, username: str, production_data: list | None) -> dict | bool:
+        """
+        Write production data returned by fetch_user_production_data to the database.
+        Returns the user's production totals, or False if the sync failed.
+        """
+        try:
+            # A failure part-way rolls back everything this call wrote
+            with self.transaction():
+                log.info("Syncing production data for user: %s", username)
+
+                # Ensure player exists
+                self.upsert_player(username)
+
+                # Bail out if the production data could not be fetched
+                if production_data is None:
+                    return False
+
+                # Collect rows for every facility so each table is written in one batch
+                facility_rows = []
+                order_rows = []
+                item_rows = []
+                input_rows = []
+                output_rows = []
+
+                for facility in production_data:
+                    production_line_id = facility.get('ProductionLineId')
+
+                    # Facility info
+                    facility_rows.append((
+                        production_line_id, facility.get('SiteId'), facility.get('PlanetId'),
+                        facility.get('PlanetNaturalId'), facility.get('PlanetName'), username,
+                        facility.get('Type'), facility.get('Capacity', 0),
+                        facility.get('Efficiency', 0), facility.get('Condition', 0)
+                    ))
+
+                    # Process orders
+                    for order in facility.get('Orders', []):
+                        order_id = order.get('ProductionLineOrderId')
+
+                        order_rows.append((
+                            order_id, production_line_id, username,
+                            order.get('CreatedEpochMs'),
+                            order.get('StartedEpochMs'),
+                            order.get('CompletionEpochMs'),
+                            order.get('DurationMs'),
+                            order.get('LastUpdatedEpochMs'),
+                            order.get('CompletedPercentage', 0),
+                            order.get('IsHalted', False),
+                            order.get('Recurring', False),
+                            order.get('StandardRecipeName'),
+                            order.get('ProductionFee', 0),
+                            order.get('ProductionFeeCurrency', 'NCC')
+                        ))
+
+                        # Input and output materials, plus the items table entries they reference
+                        for materials, rows in ((order.get('Inputs', []), input_rows),
+                                                (order.get('Outputs', []), output_rows)):
+                            for material in materials:
+                                item_rows.append((
+                                    material.get('MaterialTicker'),
+                                    material.get('MaterialName'),
+                                    material.get('MaterialCategory')
+                                ))
+                                rows.append((
+                                    order_id,
+                                    material.get('MaterialId'),
+                                    material.get('MaterialTicker'),
+                                    material.get('MaterialName'),
+                                    material.get('MaterialAmount', 0)
+                                ))
+
+                # Facilities first, then replace their orders; clearing the orders also removes
+                # their input and output materials through ON DELETE CASCADE
+                self.batch_upsert_production_facilities(facility_rows)
+                self.batch_clear_production_orders([row[0] for row in facility_rows])
+                self.batch_upsert_production_orders(order_rows)
+                self.batch_upsert_items(item_rows)
+                self.batch_upsert_production_order_inputs(input_rows)
+                self.batch_upsert_production_order_outputs(output_rows)
+
+                log.info("Successfully synced production data for %s", username)
+
+                # Totals come from the data just written, so callers need no summary query
+                orders = [order for facility in production_data for order in facility.get('Orders', [])]
+                facility_count = len(production_data)
+                return {
+                    'total_facilities': facility_count,
+                    'total_orders': len(orders),
+                    'active_orders': sum(1 for order in orders if (order.get('CompletedPercentage') or 0) < 1.0),
+                    'avg_efficiency': sum(float(facility.get('Efficiency') or 0)
+                                          for facility in production_data) / facility_count if facility_count else 0,
+                    'avg_condition': sum(float(facility.get('Condition') or 0)
+                                         for facility in production_data) / facility_count if facility_count else 0
+                }
 
         except Exception as e:
-            print(f"Error syncing production data for {username}: {e}")
+            log.exception("Error syncing production data for %s: %s", username, e)
             return False
 
     def get_user_production_summary(self, username: str) -> dict:
         """Get a summary of a user's production facilities and orders."""
-        conn = self._connect()
-        cursor = conn.cursor()
-
-        # Get production facilities
-        cursor.execute("""
-                SELECT production_line_id, planet_name, planet_natural_id, facility_type, 
-                       capacity, efficiency, facility_condition
-                FROM production_facilities 
-                WHERE username = %s
-                ORDER BY planet_name, facility_type;
-            """, (username,))
-
-        facilities = cursor.fetchall()
-
-        # Get order counts by facility
-        cursor.execute("""
-                SELECT pf.production_line_id, COUNT(po.order_id) as order_count,
-                       SUM(CASE WHEN po.completed_percentage < 1.0 THEN 1 ELSE 0 END) as active_orders,
-                       AVG(po.completed_percentage) as avg_progress
-                FROM production_facilities pf
-                LEFT JOIN production_orders po ON pf.production_line_id = po.production_line_id
-                WHERE pf.username = %s
-                GROUP BY pf.production_line_id;
-            """, (username,))
+        # Read-only, so both queries see the same snapshot even while a sync commits in between
+        with self.transaction(read_only=True), self._cursor() as cursor:
+            # Get production facilities
+            cursor.execute("""
+                    SELECT production_line_id, planet_name, planet_natural_id, facility_type, 
+                           capacity, efficiency, facility_condition
+                    FROM production_facilities 
+                    WHERE username = %s
+                    ORDER BY planet_name, facility_type;
+                """, (username,))
 
-        order_stats = {row[0]: {'total_orders': row[1], 'active_orders': row[2], 'avg_progress': row[3]}
-                       for row in cursor.fetchall()}
+            facilities = cursor.fetchall()
 
-        cursor.close()
+            # Get order counts by facility
+            cursor.execute("""
+                    SELECT pf.production_line_id, COUNT(po.order_id) as order_count,
+                           SUM(CASE WHEN po.completed_percentage < 1.0 THEN 1 ELSE 0 END) as active_orders,
+                           AVG(po.completed_percentage) as avg_progress
+                    FROM production_facilities pf
+                    LEFT JOIN production_orders po ON pf.production_line_id = po.production_line_id
+                    WHERE pf.username = %s
+                    GROUP BY pf.production_line_id;
+                """, (username,))
+
+            order_stats = {row[0]: {'total_orders': row[1], 'active_orders': row[2], 'avg_progress': row[3]}
+                           for row in cursor.fetchall()}
 
         summary = {
             'username': username,
             'facilities': [],
-            'totals': {
-                'total_facilities': len(facilities),
-                'total_orders': 0,
-                'active_orders': 0,
-                'avg_efficiency': 0,
-                'avg_condition': 0
-            }
+            'totals': {'total_facilities': len(facilities)}
         }
 
-        total_efficiency = 0
-        total_condition = 0
+        # Accumulate the totals in locals and write them to the summary once
+        total_orders = active_orders = 0
+        total_efficiency = total_condition = 0.0
 
         for facility in facilities:
             production_line_id, planet_name, planet_natural_id, facility_type, capacity, efficiency, condition = facility
             stats = order_stats.get(production_line_id, {'total_orders': 0, 'active_orders': 0, 'avg_progress': 0})
 
+            # DECIMAL columns arrive as Decimal; convert each once
+            efficiency, condition = float(efficiency), float(condition)
+
             summary['facilities'].append({
                 'production_line_id': production_line_id,
                 'planet_name': planet_name,
                 'planet_natural_id': planet_natural_id,
                 'facility_type': facility_type,
                 'capacity': capacity,
-                'efficiency': float(efficiency),
-                'condition': float(condition),
+                'efficiency': efficiency,
+                'condition': condition,
                 'total_orders': stats['total_orders'],
                 'active_orders': stats['active_orders'],
                 'avg_progress': float(stats['avg_progress']) if stats['avg_progress'] else 0
             })
 
-            summary['totals']['total_orders'] += stats['total_orders']
-            summary['totals']['active_orders'] += stats['active_orders']
-            total_efficiency += float(efficiency)
-            total_condition += float(condition)
+            total_orders += stats['total_orders']
+            active_orders += stats['active_orders']
+            total_efficiency += efficiency
+            total_condition += condition
 
-        if len(facilities) > 0:
-            summary['totals']['avg_efficiency'] = total_efficiency / len(facilities)
-            summary['totals']['avg_condition'] = total_condition / len(facilities)
+        summary['totals'].update({
+            'total_orders': total_orders,
+            'active_orders': active_orders,
+            'avg_efficiency': total_efficiency / len(facilities) if facilities else 0,
+            'avg_condition': total_condition / len(facilities) if facilities else 0
+        })
 
         return summary
 
     def get_all_players(self):
         """Get all players from the players table."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT username FROM players ORDER BY username")
-        rows = cursor.fetchall()
-        cursor.close()
-        return [row[0] for row in rows] if rows else []
+        with self._cursor() as cursor:
+            cursor.execute("SELECT username FROM players ORDER BY username")
+            rows = cursor.fetchall()
+            return [row[0] for row in rows] if rows else []
 
     def get_player(self, username: str):
         """Get a specific player by username."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT username, last_updated, created_at FROM players WHERE username = %s", (username,))
-        row = cursor.fetchone()
-        cursor.close()
-        if row:
-            return {
-                'username': row[0],
-                'last_updated': row[1],
-                'created_at': row[2]
-            }
-        return None
+        with self._cursor() as cursor:
+            cursor.execute("SELECT username, last_updated, created_at FROM players WHERE username = %s", (username,))
+            row = cursor.fetchone()
+            if row:
+                return {
+                    'username': row[0],
+                    'last_updated': row[1],
+                    'created_at': row[2]
+                }
+            return None
 
     def delete_player(self, username: str) -> bool:
         """Delete a player from the players table. Returns True if deleted, False if not found."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM players WHERE username = %s", (username,))
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        cursor.close()
-        return deleted
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM players WHERE username = %s", (username,))
+            deleted = cursor.rowcount > 0
+            return deleted
 
     def player_exists(self, username: str) -> bool:
         """Check if a player exists in the players table."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM players WHERE username = %s LIMIT 1", (username,))
-        exists = cursor.fetchone() is not None
-        cursor.close()
-        return exists
+        with self._cursor() as cursor:
+            cursor.execute("SELECT 1 FROM players WHERE username = %s LIMIT 1", (username,))
+            exists = cursor.fetchone() is not None
+            return exists
 
     def sync_user_consumption_data(self, fio_handler, username: str) -> bool:
         """
         Sync consumption/burnrate data for a specific user using FIO API.
         """
         try:
-            print(f"Syncing consumption data for user: {username}")
+            log.info("Syncing consumption data for user: %s", username)
 
             # Ensure player exists
             self.upsert_player(username)
@@ -1204,7 +1547,7 @@ class DatabaseHandler:
             # Get burnrate data
             csv_data, status_code = fio_handler.burnrate(username)
             if status_code != 200 or not csv_data:
-                print(f"Failed to get consumption data for {username} (Status: {status_code})")
+                log.warning("Failed to get consumption data for %s (Status: %s)", username, status_code)
                 return False
 
             # Parse CSV data
@@ -1215,148 +1558,154 @@ class DatabaseHandler:
             rows = list(csv_reader)
 
             if not rows:
-                print(f"No consumption data found for {username}")
+                log.info("No consumption data found for %s", username)
                 return True  # Not an error, just no data
 
-            # Clear existing consumption data for this user
-            self.clear_user_consumption_data(username)
-
-            # Process each consumption record
-            processed_count = 0
+            # Collect the records first so the rewrite below is one batch per table. The batch is
+            # all-or-nothing, so records the tables would reject are skipped here instead
+            item_rows = []
+            rate_rows = []
             for row in rows:
                 try:
-                    planet_natural_id = row.get('PlanetNaturalId', '')
-                    planet_name = row.get('PlanetName', '')
-                    material_ticker = row.get('Ticker', '')
-                    daily_consumption = float(row.get('DailyConsumption', 0))
-                    is_essential = row.get('Essential', 'False').lower() == 'true'
-
-                    # Ensure material exists in items table
-                    self.upsert_item(material_ticker, material_ticker, None)  # We don't have name/category from CSV
-
-                    # Store consumption data
-                    self.upsert_consumption_rate(
-                        username, planet_natural_id, planet_name,
-                        material_ticker, daily_consumption, is_essential
-                    )
+                    material_ticker = (row.get('Ticker') or '').strip()
+                    if not material_ticker or len(material_ticker) > self.MAX_TICKER_LENGTH:
+                        raise ValueError(f"invalid ticker {material_ticker!r}")
+
+                    daily_consumption = float(row.get('DailyConsumption') or 0)
+                    if not math.isfinite(daily_consumption) or abs(daily_consumption) >= self.MAX_DAILY_CONSUMPTION:
+                        raise ValueError(f"daily consumption {daily_consumption} out of range")
 
-                    processed_count += 1
+                    rate_rows.append((
+                        username, row.get('PlanetNaturalId', ''), row.get('PlanetName', ''), material_ticker,
+                        daily_consumption, (row.get('Essential') or 'False').lower() == 'true'
+                    ))
+                    # Ensure material exists in items table; the CSV has no name/category
+                    item_rows.append((material_ticker, material_ticker, None))
 
                 except Exception as e:
-                    print(f"Error processing consumption record for {username}: {e}")
+                    log.warning("Error processing consumption record for %s: %s", username, e)
                     continue
 
-            print(f"Successfully synced {processed_count} consumption records for {username}")
+            # Replace the user's consumption data in a single commit
+            with self.transaction():
+                self.clear_user_consumption_data(username)
+                self.batch_upsert_items(item_rows)
+                self.batch_upsert_consumption_rates(rate_rows)
+            processed_count = len(rate_rows)
+
+            log.info("Successfully synced %d consumption records for %s", processed_count, username)
             return True
 
         except Exception as e:
-            print(f"Error syncing consumption data for {username}: {e}")
+            log.exception("Error syncing consumption data for %s: %s", username, e)
             return False
 
     def clear_user_consumption_data(self, username: str) -> None:
         """Clear all consumption data for a specific user."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM consumption_rates WHERE username = %s", (username,))
-        conn.commit()
-        cursor.close()
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM consumption_rates WHERE username = %s", (username,))
+
+    def batch_upsert_consumption_rates(self, rates: list) -> None:
+        """
+        Batch insert or update consumption rates. Rates should be tuples of
+        (username, planet_natural_id, planet_name, material_ticker, daily_consumption, is_essential).
+        """
+        if not rates:
+            return
+
+        with self._cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO consumption_rates 
+                (username, planet_natural_id, planet_name, material_ticker, daily_consumption, is_essential)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                  planet_name = VALUES(planet_name),
+                  daily_consumption = VALUES(daily_consumption),
+                  is_essential = VALUES(is_essential),
+                  last_updated = CURRENT_TIMESTAMP;
+            """, rates)
 
     def upsert_consumption_rate(self, username: str, planet_natural_id: str, planet_name: str,
                                 material_ticker: str, daily_consumption: float, is_essential: bool) -> None:
         """Insert or update a consumption rate record."""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO consumption_rates 
-            (username, planet_natural_id, planet_name, material_ticker, daily_consumption, is_essential)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-              planet_name = VALUES(planet_name),
-              daily_consumption = VALUES(daily_consumption),
-              is_essential = VALUES(is_essential),
-              last_updated = CURRENT_TIMESTAMP;
-        """, (username, planet_natural_id, planet_name, material_ticker, daily_consumption, is_essential))
-        conn.commit()
-        cursor.close()
+        self.batch_upsert_consumption_rates([(username, planet_natural_id, planet_name, material_ticker,
+                                              daily_consumption, is_essential)])
 
     def get_user_consumption_summary(self, username: str):
         """Get consumption summary for a specific user."""
-        conn = self._connect()
-        cursor = conn.cursor()
-
-        # Get totals
-        cursor.execute("""
-            SELECT 
-                COUNT(DISTINCT planet_natural_id) as total_planets,
-                COUNT(DISTINCT material_ticker) as total_materials,
-                COUNT(*) as total_records,
-                SUM(daily_consumption) as total_daily_consumption,
-                SUM(CASE WHEN is_essential = TRUE THEN daily_consumption ELSE 0 END) as essential_consumption,
-                COUNT(CASE WHEN is_essential = TRUE THEN 1 ELSE NULL END) as essential_materials
-            FROM consumption_rates 
-            WHERE username = %s
-        """, (username,))
-        totals_row = cursor.fetchone()
-
-        totals = {
-            'total_planets': totals_row[0] or 0,
-            'total_materials': totals_row[1] or 0,
-            'total_records': totals_row[2] or 0,
-            'total_daily_consumption': float(totals_row[3] or 0),
-            'essential_consumption': float(totals_row[4] or 0),
-            'essential_materials': totals_row[5] or 0
-        }
+        with self._cursor() as cursor:
+            # Get totals
+            cursor.execute("""
+                SELECT 
+                    COUNT(DISTINCT planet_natural_id) as total_planets,
+                    COUNT(DISTINCT material_ticker) as total_materials,
+                    COUNT(*) as total_records,
+                    SUM(daily_consumption) as total_daily_consumption,
+                    SUM(CASE WHEN is_essential = TRUE THEN daily_consumption ELSE 0 END) as essential_consumption,
+                    COUNT(CASE WHEN is_essential = TRUE THEN 1 ELSE NULL END) as essential_materials
+                FROM consumption_rates 
+                WHERE username = %s
+            """, (username,))
+            totals_row = cursor.fetchone()
+
+            totals = {
+                'total_planets': totals_row[0] or 0,
+                'total_materials': totals_row[1] or 0,
+                'total_records': totals_row[2] or 0,
+                'total_daily_consumption': float(totals_row[3] or 0),
+                'essential_consumption': float(totals_row[4] or 0),
+                'essential_materials': totals_row[5] or 0
+            }
 
-        # Get consumption by planet
-        cursor.execute("""
-            SELECT 
-                planet_natural_id,
-                planet_name,
-                COUNT(*) as material_count,
-                SUM(daily_consumption) as planet_consumption,
-                SUM(CASE WHEN is_essential = TRUE THEN daily_consumption ELSE 0 END) as essential_consumption
-            FROM consumption_rates 
-            WHERE username = %s
-            GROUP BY planet_natural_id, planet_name
-            ORDER BY planet_consumption DESC
-        """, (username,))
-
-        planets = []
-        for row in cursor.fetchall():
-            planets.append({
-                'planet_natural_id': row[0],
-                'planet_name': row[1],
-                'material_count': row[2],
-                'planet_consumption': float(row[3]),
-                'essential_consumption': float(row[4])
-            })
+            # Get consumption by planet
+            cursor.execute("""
+                SELECT 
+                    planet_natural_id,
+                    planet_name,
+                    COUNT(*) as material_count,
+                    SUM(daily_consumption) as planet_consumption,
+                    SUM(CASE WHEN is_essential = TRUE THEN daily_consumption ELSE 0 END) as essential_consumption
+                FROM consumption_rates 
+                WHERE username = %s
+                GROUP BY planet_natural_id, planet_name
+                ORDER BY planet_consumption DESC
+            """, (username,))
 
-        # Get consumption by material
-        cursor.execute("""
-            SELECT 
-                material_ticker,
-                SUM(daily_consumption) as total_consumption,
-                COUNT(DISTINCT planet_natural_id) as planet_count,
-                MAX(is_essential) as is_essential
-            FROM consumption_rates 
-            WHERE username = %s
-            GROUP BY material_ticker
-            ORDER BY total_consumption DESC
-        """, (username,))
-
-        materials = []
-        for row in cursor.fetchall():
-            materials.append({
-                'material_ticker': row[0],
-                'total_consumption': float(row[1]),
-                'planet_count': row[2],
-                'is_essential': bool(row[3])
-            })
+            planets = []
+            for row in cursor.fetchall():
+                planets.append({
+                    'planet_natural_id': row[0],
+                    'planet_name': row[1],
+                    'material_count': row[2],
+                    'planet_consumption': float(row[3]),
+                    'essential_consumption': float(row[4])
+                })
 
-        cursor.close()
+            # Get consumption by material
+            cursor.execute("""
+                SELECT 
+                    material_ticker,
+                    SUM(daily_consumption) as total_consumption,
+                    COUNT(DISTINCT planet_natural_id) as planet_count,
+                    MAX(is_essential) as is_essential
+                FROM consumption_rates 
+                WHERE username = %s
+                GROUP BY material_ticker
+                ORDER BY total_consumption DESC
+            """, (username,))
 
-        return {
-            'totals': totals,
-            'planets': planets,
-            'materials': materials
-        }
\ No newline at end of file
+            materials = []
+            for row in cursor.fetchall():
+                materials.append({
+                    'material_ticker': row[0],
+                    'total_consumption': float(row[1]),
+                    'planet_count': row[2],
+                    'is_essential': bool(row[3])
+                })
+
+
+            return {
+                'totals': totals,
+                'planets': planets,
+                'materials': materials
+            }
\ No newline at end of file
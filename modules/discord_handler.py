@@ -9,12 +9,10 @@ class DiscordHandler:
     def __init__(self):
         # Initialize DB and retrieve token
         self.db = DatabaseHandler()
-        raw_token = self.db.get_setting('discord_token')
-        if raw_token:
-            token = raw_token.decode('utf-8')
-        else:
+        token = self.db.get_setting('discord_token')
+        if not token:
             token = input("🔑  Enter your Discord bot token: ").strip()
-            self.db.upsert_setting('discord_token', token.encode('utf-8'))
+            self.db.upsert_setting('discord_token', token)
         self.token = token
 
         # Permission check for admin-only commands
@@ -1,13 +1,35 @@
+import json
+import random
+import sys
+import threading
+import time
+
 import requests
 from modules.database_handler import DatabaseHandler
 
 
 class FIOHandler:
-    def __init__(self):
-        """Initialize the FIO Handler and ensure API key is configured."""
-        self.db_handler = DatabaseHandler()
+    # Rate-limited (429) and server error (5xx) responses are retried this many times in total
+    MAX_ATTEMPTS = 5
+
+    # Upper bound (in seconds) for a single wait between retries
+    MAX_RETRY_DELAY = 60
+
+    # Upper bound on FIO requests in flight across every thread and handler in the process
+    MAX_CONCURRENT_REQUESTS = 4
+    _request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+    def __init__(self, db_handler: DatabaseHandler = None):
+        """
+        Initialize the FIO Handler and ensure API key is configured.
+
+        Args:
+            db_handler (DatabaseHandler): Existing database handler to reuse, if any
+        """
+        self.db_handler = db_handler or DatabaseHandler()
         self.api_key = None
         self.base_url = "https://rest.fnar.net"
+        self._etag_cache = {}  # (url, params) -> (etag, response_text)
 
         # Get or configure API key during initialization
         self._setup_api_key()
@@ -18,10 +40,6 @@ class FIOHandler:
         stored_key = self.db_handler.get_setting('fio_api_key')
 
         if stored_key is not None:
-            # Convert bytes back to string if needed
-            if isinstance(stored_key, bytes):
-                stored_key = stored_key.decode('utf-8')
-
             # Verify the stored key is still valid (silent check)
             if self._validate_key_silent(stored_key):
                 self.api_key = stored_key
@@ -30,7 +48,9 @@ class FIOHandler:
             else:
                 print("⚠ Stored API key is no longer valid")
 
-        # No valid key found, get one from user
+        # No valid key found; only prompt when someone is there to answer
+        if not sys.stdin.isatty():
+            raise RuntimeError("No valid FIO API key configured; run `python main.py --inventory` to set one")
         self._prompt_for_api_key()
 
     def _prompt_for_api_key(self):
@@ -46,7 +66,7 @@ class FIOHandler:
                 # Test the API key
                 if self.auth(api_key):
                     # Save valid key to database
-                    self.db_handler.upsert_setting('fio_api_key', api_key.encode('utf-8'))
+                    self.db_handler.upsert_setting('fio_api_key', api_key)
                     self.api_key = api_key
                     print("✓ API key saved and verified successfully")
                     break
@@ -165,6 +185,80 @@ class FIOHandler:
         """Check if the handler has a valid API key configured."""
         return self.api_key is not None and self._validate_key_silent(self.api_key)
 
+    def _get(self, path: str, accept: str = 'application/json', params: dict = None,
+             authorize: bool = True):
+        """
+        Send a GET request to the FIO API, revalidating a previously seen response with its ETag.
+
+        Args:
+            path (str): API path, starting with '/'
+            accept (str): Value for the Accept header
+            params (dict): Query string parameters, if any
+            authorize (bool): Whether to send the API key in the Authorization header
+
+        Returns:
+            tuple: (response_text, status_code); a 304 is served from the cache as a 200
+        """
+        url = f"{self.base_url}{path}"
+        headers = {
+            'User-Agent': 'FIO-Handler/1.0',
+            'Accept': accept
+        }
+        if authorize:
+            headers['Authorization'] = self.api_key
+
+        cache_key = (url, tuple(sorted(params.items())) if params else None)
+        cached = self._etag_cache.get(cache_key)
+        if cached:
+            headers['If-None-Match'] = cached[0]
+
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            # Only the request holds a slot; the wait before a retry lets other requests through
+            with self._request_slots:
+                response = requests.get(url, params=params, headers=headers, timeout=10)
+            if (response.status_code != 429 and response.status_code < 500) or attempt == self.MAX_ATTEMPTS:
+                break
+
+            delay = self._retry_delay(response, attempt)
+            print(f"⚠ FIO returned HTTP {response.status_code} for {path}, retrying in {delay:.1f}s "
+                  f"({attempt}/{self.MAX_ATTEMPTS - 1})")
+            time.sleep(delay)
+
+        if response.status_code == 304 and cached:
+            return cached[1], 200
+
+        etag = response.headers.get('ETag')
+        if response.status_code == 200 and etag:
+            self._etag_cache[cache_key] = (etag, response.text)
+
+        return response.text, response.status_code
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        """
+        Work out how long to wait before retrying a failed request.
+
+        Args:
+            response (requests.Response): The rate-limited or failed response
+            attempt (int): Number of attempts made so far
+
+        Returns:
+            float: Seconds to wait, honouring Retry-After when the server sends one
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(self.MAX_RETRY_DELAY, int(retry_after))
+
+        # Exponential backoff with jitter so concurrent workers don't retry in lockstep
+        return min(self.MAX_RETRY_DELAY, 2 ** attempt) + random.uniform(0, 1)
+
+    @staticmethod
+    def _parse_json(text: str):
+        """Parse a JSON response body, returning None if it is empty or invalid."""
+        try:
+            return json.loads(text) if text.strip() else None
+        except ValueError:
+            return None
+
     def company_code(self, company_code: str):
         """
         Get company information by company code.
@@ -179,25 +273,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/company/code/{company_code}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/company/code/{company_code}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in company_code request: {e}")
@@ -217,25 +294,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/company/name/{company_name}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/company/name/{company_name}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in company_name request: {e}")
@@ -255,25 +315,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/production/{username}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/production/{username}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in production request: {e}")
@@ -293,25 +336,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/sites/planets/{username}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/sites/planets/{username}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in sites_planets request: {e}")
@@ -332,25 +358,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/sites/{username}/{planet_identifier}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/sites/{username}/{planet_identifier}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in sites request: {e}")
@@ -370,25 +379,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/storage/{username}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/storage/{username}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in storage request: {e}")
@@ -408,25 +400,8 @@ class FIOHandler:
             return None, None
 
         try:
-            headers = {
-                'Authorization': self.api_key,
-                'User-Agent': 'FIO-Handler/1.0',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(
-                f"{self.base_url}/sites/warehouses/{username}",
-                headers=headers,
-                timeout=10
-            )
-
-            # Handle JSON response
-            try:
-                json_data = response.json() if response.text.strip() else None
-            except:
-                json_data = None
-
-            return json_data, response.status_code
+            text, status_code = self._get(f"/sites/warehouses/{username}")
+            return self._parse_json(text), status_code
 
         except Exception as e:
             print(f"❌ Error in sites_warehouses request: {e}")
@@ -447,24 +422,20 @@ class FIOHandler:
 
         try:
             # Note: This endpoint uses apikey as query parameter instead of Authorization header
-            response = requests.get(
-                f"{self.base_url}/csv/burnrate",
+            text, status_code = self._get(
+                "/csv/burnrate",
+                accept='application/csv',
                 params={
                     'apikey': self.api_key,
                     'username': username
                 },
-                headers={
-                    'User-Agent': 'FIO-Handler/1.0',
-                    'Accept': 'application/csv'
-                },
-                timeout=10
+                authorize=False
             )
 
             # Return raw CSV text instead of trying to parse as JSON
-            csv_data = response.text if response.text.strip() else None
-            return csv_data, response.status_code
+            csv_data = text if text.strip() else None
+            return csv_data, status_code
 
         except Exception as e:
             print(f"❌ Error in burnrate request: {e}")
             return None, None
-
@@ -2,6 +2,7 @@
 
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
@@ -13,8 +14,9 @@ from modules.database_handler import DatabaseHandler
 
 
 class GoogleSheetsHandler:
-    def __init__(self):
-        self.db = DatabaseHandler()
+    def __init__(self, db: Optional[DatabaseHandler] = None):
+        # Reuse the caller's database handler when one is available
+        self.db = db or DatabaseHandler()
         self.project_root = Path(__file__).resolve().parents[1]
         self.credentials_path = self.project_root / 'google.json'
         self.client = None
@@ -63,15 +65,16 @@ class GoogleSheetsHandler:
             print(f"❌ Failed to open spreadsheet: {e}")
             raise
 
-    def parse_prices_sheet(self, worksheet) -> Tuple[Optional[str], List[Dict]]:
+    def fetch_sheet_values(self, spreadsheet, sheet_name: str) -> List[List[str]]:
+        """Fetch all cell values of a worksheet."""
+        return spreadsheet.worksheet(sheet_name).get_all_values()
+
+    def parse_prices_sheet(self, all_values: List[List[str]]) -> Tuple[Optional[str], List[Dict]]:
         """
-        Parse the Prices sheet and return last updated date and price data.
+        Parse the Prices sheet values and return last updated date and price data.
         Returns: (last_updated_date, list_of_price_records)
         """
         try:
-            # Get all values from the sheet
-            all_values = worksheet.get_all_values()
-
             if len(all_values) < 3:
                 print("❌ Prices sheet doesn't have enough rows")
                 return None, []
@@ -183,15 +186,12 @@ class GoogleSheetsHandler:
             print(f"❌ Error parsing prices sheet: {e}")
             return None, []
 
-    def parse_shipping_sheet(self, worksheet) -> List[Dict]:
+    def parse_shipping_sheet(self, all_values: List[List[str]]) -> List[Dict]:
         """
-        Parse the Shipping sheet and return shipping data.
+        Parse the Shipping sheet values and return shipping data.
         Returns: list_of_shipping_records
         """
         try:
-            # Get all values from the sheet
-            all_values = worksheet.get_all_values()
-
             if len(all_values) < 2:
                 print("❌ Shipping sheet doesn't have enough data")
                 return []
@@ -276,11 +276,17 @@ class GoogleSheetsHandler:
             spreadsheet = self.open_spreadsheet(spreadsheet_id)
             print(f"📊 Opened spreadsheet: {spreadsheet.title}")
 
+            # Download both sheets concurrently; parsing writes to the database, so it stays sequential
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                prices_future = executor.submit(self.fetch_sheet_values, spreadsheet, prices_sheet_name)
+                shipping_future = executor.submit(self.fetch_sheet_values, spreadsheet, shipping_sheet_name)
+
             # Process Prices sheet
+            last_updated = None
             try:
-                prices_sheet = spreadsheet.worksheet(prices_sheet_name)
+                prices_values = prices_future.result()
                 print(f"📋 Processing {prices_sheet_name} sheet...")
-                last_updated, price_records = self.parse_prices_sheet(prices_sheet)
+                last_updated, price_records = self.parse_prices_sheet(prices_values)
                 if last_updated:
                     print(f"📅 Prices last updated: {last_updated}")
             except Exception as e:
@@ -289,9 +295,9 @@ class GoogleSheetsHandler:
 
             # Process Shipping sheet
             try:
-                shipping_sheet = spreadsheet.worksheet(shipping_sheet_name)
+                shipping_values = shipping_future.result()
                 print(f"🚚 Processing {shipping_sheet_name} sheet...")
-                shipping_records = self.parse_shipping_sheet(shipping_sheet)
+                shipping_records = self.parse_shipping_sheet(shipping_values)
             except Exception as e:
                 print(f"⚠️  Could not process {shipping_sheet_name} sheet: {e}")
                 shipping_records = []
@@ -9,12 +9,10 @@ class TelegramHandler:
     def __init__(self):
         # Initialize DB and retrieve token
         self.db = DatabaseHandler()
-        raw_token = self.db.get_setting('telegram_token')
-        if raw_token:
-            token = raw_token.decode('utf-8')
-        else:
+        token = self.db.get_setting('telegram_token')
+        if not token:
             token = input("🔑  Enter your Telegram bot token: ").strip()
-            self.db.upsert_setting('telegram_token', token.encode('utf-8'))
+            self.db.upsert_setting('telegram_token', token)
         self.token = token
 
         # Create application
@@ -0,0 +1,165 @@
+import threading
+import unittest
+from unittest import mock
+
+from modules.config_handler import ConfigHandler
+from modules.database_handler import DatabaseHandler, _TABLE_NAMES
+
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+        self.query = None
+
+    def execute(self, query, params=None):
+        self.query = ' '.join(query.split())
+        self.statements.append((self.query, params))
+
+    def executemany(self, query, rows):
+        self.statements.append((' '.join(query.split()), list(rows)))
+
+    def fetchone(self):
+        # Only the table existence check in _ensure_tables reads a single row
+        if 'information_schema' in self.query:
+            return (len(_TABLE_NAMES),)
+        return None
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+    def start_transaction(self, readonly=False):
+        self.statements.append(('START TRANSACTION', None))
+
+    def commit(self):
+        self.statements.append(('COMMIT', None))
+
+    def rollback(self):
+        self.statements.append(('ROLLBACK', None))
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_connection(self):
+        return self.conn
+
+
+class FakeConfigHandler(ConfigHandler):
+    """A ConfigHandler with a config already loaded, so it never reads config.json or prompts."""
+
+    def __init__(self):
+        super().__init__()
+        self.config = {'host': 'localhost', 'port': 3306, 'database': 'test', 'user': 'test', 'password': ''}
+
+
+def make_handler(test):
+    """Build a DatabaseHandler through its real __init__, on a fake pooled connection."""
+    conn = FakeConnection()
+    for patcher in (mock.patch('modules.database_handler.ConfigHandler', FakeConfigHandler),
+                    mock.patch('modules.config_handler._get_pool', return_value=FakePool(conn))):
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return DatabaseHandler(), conn
+
+
+def item_inserts(conn):
+    return [params for query, params in conn.statements if query.startswith('INSERT INTO items')]
+
+
+class TransactionCacheTests(unittest.TestCase):
+    def test_items_rolled_back_to_savepoint_are_written_again(self):
+        handler, conn = make_handler(self)
+
+        with handler.transaction():
+            with self.assertRaises(RuntimeError):
+                with handler.transaction():
+                    handler.batch_upsert_items([('RAT', 'Rations', 'consumables')])
+                    raise RuntimeError("sync failed")
+
+        handler.batch_upsert_items([('RAT', 'Rations', 'consumables')])
+
+        self.assertEqual(item_inserts(conn), [[('RAT', 'Rations', 'consumables')]] * 2)
+
+    def test_committed_items_are_skipped(self):
+        handler, conn = make_handler(self)
+
+        with handler.transaction():
+            handler.batch_upsert_items([('RAT', 'Rations', 'consumables')])
+        handler.batch_upsert_items([('RAT', 'Rations', 'consumables')])
+
+        self.assertEqual(len(item_inserts(conn)), 1)
+
+    def test_rolled_back_settings_are_not_cached(self):
+        handler, conn = make_handler(self)
+
+        with self.assertRaises(RuntimeError):
+            with handler.transaction():
+                handler.upsert_setting('fio_api_key', 'abc')
+                handler.upsert_settings({'google_sheets_id': 'xyz'})
+                raise RuntimeError("write failed")
+
+        self.assertEqual(handler._settings_cache, {})
+
+    def test_committed_settings_are_cached(self):
+        handler, conn = make_handler(self)
+
+        with handler.transaction():
+            handler.upsert_setting('fio_api_key', 'abc')
+        handler.upsert_settings({'google_sheets_id': 'xyz'})
+
+        self.assertEqual(handler._settings_cache, {'fio_api_key': 'abc', 'google_sheets_id': 'xyz'})
+
+
+
+class LookupCacheTests(unittest.TestCase):
+    def test_lookups_inside_a_rolled_back_transaction_are_not_cached(self):
+        handler, conn = make_handler(self)
+
+        with self.assertRaises(RuntimeError):
+            with handler.transaction():
+                self.assertEqual(handler._cached('prices', ('RAT', None), lambda: 99.0), 99.0)
+                raise RuntimeError("write failed")
+
+        self.assertEqual(handler._cached('prices', ('RAT', None), lambda: 42.0), 42.0)
+
+    def test_lookups_inside_a_transaction_see_the_database(self):
+        handler, conn = make_handler(self)
+        handler._cached('prices', ('RAT', None), lambda: 42.0)
+
+        with handler.transaction():
+            self.assertEqual(handler._cached('prices', ('RAT', None), lambda: 99.0), 99.0)
+
+    def test_invalidation_also_applies_on_commit(self):
+        handler, conn = make_handler(self)
+
+        def cache_old_price():
+            handler._cached('prices', ('RAT', None), lambda: 42.0)
+
+        with handler.transaction():
+            handler._invalidate('prices')
+            # Another thread reads the committed row before this transaction commits
+            reader = threading.Thread(target=cache_old_price)
+            reader.start()
+            reader.join()
+            self.assertIn('prices', handler._lookup_cache)
+
+        self.assertNotIn('prices', handler._lookup_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()